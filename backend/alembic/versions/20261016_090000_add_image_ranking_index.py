@@ -0,0 +1,32 @@
+"""Add composite index matching the image ranking order
+
+Revision ID: 002_image_ranking_index
+Revises: 001_elo_sigma_update
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_image_ranking_index'
+down_revision: Union[str, None] = '001_elo_sigma_update'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index (mu DESC, sigma ASC, exposures DESC, sha256 ASC) so rankings come back pre-sorted."""
+    op.create_index(
+        'idx_images_ranking',
+        'images',
+        [sa.text('mu DESC'), sa.text('sigma ASC'), sa.text('exposures DESC'), sa.text('sha256 ASC')],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_images_ranking', table_name='images', if_exists=True)
@@ -0,0 +1,39 @@
+"""Add stored ci_lower column for threshold_ci galleries
+
+Revision ID: 003_image_ci_lower
+Revises: 002_image_ranking_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_image_ci_lower'
+down_revision: Union[str, None] = '002_image_ranking_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add images.ci_lower = mu - 1.0 * sigma (generated) and index it for non-archived images."""
+    op.add_column(
+        'images',
+        sa.Column('ci_lower', sa.Float(), sa.Computed('mu - 1.0 * sigma', persisted=True))
+    )
+    op.create_index(
+        'idx_images_ci_lower_active',
+        'images',
+        [sa.text('ci_lower DESC')],
+        postgresql_where=sa.text('NOT is_archived_hard_no'),
+        sqlite_where=sa.text('NOT is_archived_hard_no'),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_images_ci_lower_active', table_name='images', if_exists=True)
+    op.drop_column('images', 'ci_lower')
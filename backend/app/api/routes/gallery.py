@@ -175,15 +175,8 @@ async def get_legacy_gallery_images(
     
     directory_service = DirectoryService(db)
     
-    # Get uploaded images
-    
-    # Get paths from cache
-    all_sha256s = directory_service.get_all_sha256s()
-    image_paths = {sha256: directory_service.get_path_by_sha256(sha256) 
-                   for sha256 in all_sha256s}
-    
-    # Build base query - get all images that have stats
-    base_stmt = select(Image)
+    # Build base query - only the columns the response uses
+    base_stmt = select(Image.sha256, Image.likes, Image.unlikes, Image.skips, Image.exposures)
     count_stmt = select(func.count(Image.sha256))
     
     # Apply filters
@@ -211,9 +204,12 @@ async def get_legacy_gallery_images(
     base_stmt = base_stmt.offset(offset).limit(limit)
     
     # Execute queries to get image records
-    images = list(db.execute(base_stmt).scalars().all())
+    images = db.execute(base_stmt).all()
     total = db.execute(count_stmt).scalar() or 0
     
+    # Resolve paths for this page only, in one query
+    image_paths = directory_service.get_paths_by_sha256(image.sha256 for image in images)
+    
     # Filter images to only include those in the current directory
     filtered_images = []
     for image in images:
@@ -234,9 +230,10 @@ async def get_legacy_gallery_images(
                 )
             )
     
+    # total comes from the SQL count so clients can page; files missing on disk are only dropped from the page
     return LegacyGalleryResponse(
         images=filtered_images,
-        total=len(filtered_images),
+        total=total,
         offset=offset,
         limit=limit
     )
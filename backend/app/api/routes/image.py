@@ -13,25 +13,14 @@ router = APIRouter()
 async def serve_image(sha256: str, db: Session = Depends(get_db)):
     """Serve image file directly from filesystem using SHA256."""
     try:
-        from ...models.image import Image
-        
-        # First check if image exists in database with file_path
-        image = db.query(Image).filter(Image.sha256 == sha256).first()
-        
-        file_path = None
-        
-        if image and image.file_path and os.path.exists(image.file_path):
-            # Use file_path from database (for uploaded files)
-            file_path = image.file_path
-        else:
-            # Try to find in uploads directory
-            service = DirectoryService(db)
-            file_path = service.get_path_by_sha256(sha256)
+        # Database file_path first, then the uploads directory
+        service = DirectoryService(db)
+        file_path = service.get_path_by_sha256(sha256)
         
         if not file_path:
             raise HTTPException(status_code=404, detail="Image not found. Please ensure the image was uploaded properly.")
         
-        # Check if file still exists
+        # Lookup existence checks are cached, so confirm the file is still there
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="Image file not found on disk")
         
@@ -30,7 +30,7 @@ async def get_image_pair(db: Session = Depends(get_db)):
         directory_service = DirectoryService(db)
         
         # Check if there are any uploaded images
-        if len(directory_service.get_all_sha256s()) == 0:
+        if directory_service.count_images() == 0:
             raise HTTPException(
                 status_code=404,
                 detail="No images found. Please upload images using the folder picker in the UI."
@@ -8,6 +8,9 @@ from ...services.portfolio_service import PortfolioService
 
 router = APIRouter()
 
+# Bytes sent per chunk when streaming a portfolio zip
+ZIP_CHUNK_SIZE = 64 * 1024
+
 
 class CreatePortfolioRequest(BaseModel):
     name: str
@@ -65,7 +68,7 @@ async def get_portfolio(
     """Get portfolio details."""
     service = PortfolioService(db)
     
-    portfolio = service.get_portfolio(portfolio_id)
+    portfolio = service.get_portfolio_with_images(portfolio_id)
     if not portfolio:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,13 +101,14 @@ async def download_portfolio(
                 detail="No images found to export"
             )
         
-        # Return the zip file as a streaming response
+        # Return the zip file as a streaming response, in chunks rather than full copies of the buffer
+        zip_size = zip_buffer.getbuffer().nbytes
         return StreamingResponse(
-            iter([zip_buffer.read()]),
+            iter(lambda: zip_buffer.read(ZIP_CHUNK_SIZE), b""),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename={zip_filename}",
-                "Content-Length": str(len(zip_buffer.getvalue()))
+                "Content-Length": str(zip_size)
             }
         )
     except FileNotFoundError as e:
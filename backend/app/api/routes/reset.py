@@ -5,6 +5,7 @@ from sqlalchemy import text
 from ...core.database import get_db
 from ...models.image import Image
 from ...models.choice import Choice
+from ...services.directory_service import clear_verified_paths
 
 router = APIRouter()
 
@@ -33,6 +34,7 @@ async def reset_gallery_data():
                     os.remove(file_path)
                 except Exception:
                     pass
+            clear_verified_paths()
             reset_items.append("All uploaded files deleted")
         
         # Delete all database records using direct SQL connection
@@ -34,15 +34,8 @@ async def get_stats(db: Session = Depends(get_db)):
     directory_service = DirectoryService(db)
     stats_data = service.get_stats()
     
-    # Get all uploaded images
-    
-    # Get paths from cache
-    all_sha256s = directory_service.get_all_sha256s()
-    image_paths = {sha256: directory_service.get_path_by_sha256(sha256) 
-                   for sha256 in all_sha256s}
-    
-    # Use the image_paths mapping we created above
-    directory_images = {sha256: path for sha256, path in image_paths.items() if path}
+    # Get paths for all uploaded images in one query
+    directory_images = directory_service.get_paths_by_sha256()
     
     # Convert by_image data to Pydantic models with file paths
     by_image_stats = []
@@ -3,7 +3,9 @@ import hashlib
 from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from ...core.database import get_db
 from ...services.directory_service import DirectoryService
 from ...models.image import Image
@@ -33,10 +35,13 @@ async def upload_images(
     
     uploaded_count = 0
     errors = []
+    pending = {}  # sha256 -> (upload, content), so repeats within the batch collapse to one
+    new_images = {}
     
     # Initialize directory service
     directory_service = DirectoryService(db)
     
+    # Validate and hash the whole batch before touching the disk
     for image in images:
         try:
             print(f"Processing file: {image.filename}, content_type: {image.content_type}")
@@ -60,13 +65,30 @@ async def upload_images(
             # Generate SHA256 hash
             sha256_hash = hashlib.sha256(content).hexdigest()
             
-            # Check if image already exists
-            existing = db.query(Image).filter(Image.sha256 == sha256_hash).first()
-            if existing:
+            # Same content earlier in this batch
+            if sha256_hash in pending:
                 print(f"Duplicate image found: {sha256_hash}")
                 errors.append(f"{image.filename}: Image already exists (duplicate)")
                 continue
+            pending[sha256_hash] = (image, content)
             
+        except Exception as e:
+            print(f"Error processing {image.filename}: {str(e)}")
+            errors.append(f"{image.filename}: {str(e)}")
+            continue
+    
+    # One lookup for every hash in the batch, so stored images are never rewritten
+    existing = set()
+    if pending:
+        existing = set(db.execute(select(Image.sha256).where(Image.sha256.in_(pending))).scalars())
+    
+    for sha256_hash, (image, content) in pending.items():
+        if sha256_hash in existing:
+            print(f"Duplicate image found: {sha256_hash}")
+            errors.append(f"{image.filename}: Image already exists (duplicate)")
+            continue
+        
+        try:
             # Save file with SHA256 as filename
             file_extension = os.path.splitext(image.filename)[1] or '.jpg'
             file_path = os.path.join(UPLOAD_DIR, f"{sha256_hash}{file_extension}")
@@ -83,24 +105,22 @@ async def upload_images(
             except Exception:
                 pass  # Use defaults if PIL fails
             
-            # Create database entry
-            new_image = Image(
-                sha256=sha256_hash,
-                file_path=file_path,
-                original_filename=image.filename,
-                width=width,
-                height=height,
-                file_size=len(content),
-                mu=1500.0,  # Default Elo rating
-                sigma=350.0,  # Default uncertainty
-                exposures=0,
-                likes=0,
-                unlikes=0,
-                skips=0
-            )
-            
-            db.add(new_image)
-            uploaded_count += 1
+            # Queue database entry for the bulk insert below
+            new_images[sha256_hash] = {
+                "sha256": sha256_hash,
+                "file_path": file_path,
+                "original_filename": image.filename,
+                "width": width,
+                "height": height,
+                "file_size": len(content),
+                "mu": 1500.0,  # Default Elo rating
+                "sigma": 350.0,  # Default uncertainty
+                "exposures": 0,
+                "likes": 0,
+                "unlikes": 0,
+                "skips": 0,
+                "is_archived_hard_no": False
+            }
             print(f"Successfully processed: {image.filename} -> {sha256_hash}")
             
         except Exception as e:
@@ -108,8 +128,21 @@ async def upload_images(
             errors.append(f"{image.filename}: {str(e)}")
             continue
     
-    # Commit all changes
+    # Insert all new images in one statement and commit; rows a concurrent upload beat us to aren't returned
     try:
+        if new_images:
+            stmt = (
+                pg_insert(Image)
+                .values(list(new_images.values()))
+                .on_conflict_do_nothing(index_elements=["sha256"])
+                .returning(Image.sha256)
+            )
+            inserted = set(db.execute(stmt).scalars())
+            uploaded_count = len(inserted)
+            for sha256_hash, row in new_images.items():
+                if sha256_hash not in inserted:
+                    print(f"Duplicate image found: {sha256_hash}")
+                    errors.append(f"{row['original_filename']}: Image already exists (duplicate)")
         db.commit()
     except Exception as e:
         db.rollback()
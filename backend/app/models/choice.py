@@ -14,7 +14,7 @@ class Choice(Base):
     right_sha256 = Column(String(64), ForeignKey("images.sha256", ondelete="CASCADE"), nullable=False)
     winner_sha256 = Column(String(64), nullable=True)  # NULL if skipped
     skipped = Column(Boolean, nullable=False, default=False, server_default=text('false'))
-    decided_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text('NOW()'))
+    decided_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text('CURRENT_TIMESTAMP'))
     
     __table_args__ = (
         Index('idx_choices_round', 'round'),
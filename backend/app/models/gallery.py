@@ -11,7 +11,7 @@ class Gallery(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)  # BIGSERIAL equivalent
     name = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text('NOW()'))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text('CURRENT_TIMESTAMP'))
     selection_policy = Column(String, nullable=False)  # e.g., top_k / threshold_mu / threshold_ci / manual
     selection_params = Column(JSONB, nullable=False)
     duplicates_policy = Column(String, nullable=False)  # include_duplicates / collapse_to_canonical / exclude_duplicates
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, Integer, Boolean, Float, text, Index
+from sqlalchemy import Column, String, Integer, Boolean, Float, Computed, text, Index
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 
+# z used by the stored ci_lower column (the default confidence_z)
+CI_LOWER_Z = 1.0
+
 
 class Image(Base):
     """Image with Elo+σ rating system as per algo-update.yaml spec."""
@@ -21,6 +24,7 @@ class Image(Base):
     # Elo+σ rating fields
     mu = Column(Float, nullable=False, default=1500.0, server_default=text('1500.0'))
     sigma = Column(Float, nullable=False, default=350.0, server_default=text('350.0'))
+    ci_lower = Column(Float, Computed(f'mu - {CI_LOWER_Z} * sigma', persisted=True))  # mu - z*sigma at CI_LOWER_Z, indexable
     
     # Statistics counters
     exposures = Column(Integer, nullable=False, default=0, server_default=text('0'))
@@ -38,6 +42,13 @@ class Image(Base):
     __table_args__ = (
         Index('idx_images_mu_sigma', 'mu', 'sigma'),
         Index('idx_images_exposures', 'exposures'),
+        # Matches the ranking ORDER BY used by convergence/progress and galleries
+        Index('idx_images_ranking', mu.desc(), sigma.asc(), exposures.desc(), sha256.asc()),
+        Index(
+            'idx_images_ci_lower_active', ci_lower.desc(),
+            postgresql_where=text('NOT is_archived_hard_no'),
+            sqlite_where=text('NOT is_archived_hard_no')
+        ),
     )
     
     # Relationships
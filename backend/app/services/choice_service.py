@@ -1,10 +1,14 @@
-from typing import List, Dict, Any
+import uuid
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 from ..models.image import Image
 from ..models.choice import Choice
 from ..models.user import User
 
+# Default user ID, cached for the life of the process after the first lookup
+_default_user_id: Optional[str] = None
+
 
 class ChoiceService:
     """Service for choice and statistics management."""
@@ -45,6 +49,14 @@ class ChoiceService:
     
     def ensure_default_user(self) -> str:
         """Ensure a default user exists and return their ID."""
+        global _default_user_id
+        
+        # Known ID: primary-key get hits the identity map when already loaded
+        if _default_user_id is not None:
+            if self.db.get(User, uuid.UUID(_default_user_id)) is not None:
+                return _default_user_id
+            _default_user_id = None
+        
         stmt = select(User).limit(1)
         user = self.db.execute(stmt).scalar_one_or_none()
         
@@ -53,4 +65,5 @@ class ChoiceService:
             self.db.add(user)
             self.db.commit()
         
-        return str(user.id)
\ No newline at end of file
+        _default_user_id = str(user.id)
+        return _default_user_id
\ No newline at end of file
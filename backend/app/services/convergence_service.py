@@ -1,8 +1,8 @@
 """
 Convergence detection system implementing algo-update.yaml section 6.
 """
-import statistics
 from typing import Dict, List, Optional, Tuple, Any
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func, text, desc, asc
 from ..models.image import Image
@@ -37,20 +37,21 @@ class ConvergenceService:
         """
         current_round = self._get_current_round()
         
-        # Get ordered images by ranking
+        # Get ordered images by ranking, plus their numeric columns as arrays
         ordered_images = self._get_ordered_images()
+        ranking = self._ranking_arrays(ordered_images)
         
         # Coverage metrics
         coverage = self._compute_coverage()
         
         # Top-K analysis
-        top_k_data = self._analyze_top_k(ordered_images)
+        top_k_data = self._analyze_top_k(ordered_images, ranking)
         
         # Stability analysis
         stability = self._analyze_stability(current_round)
         
         # Boundary analysis
-        boundary = self._analyze_boundary_gap(ordered_images)
+        boundary = self._analyze_boundary_gap(ordered_images, ranking)
         
         # Predicate evaluation
         predicates = self._evaluate_predicates(coverage, top_k_data, boundary, stability)
@@ -77,11 +78,14 @@ class ConvergenceService:
     
     def _get_ordered_images(self) -> List[Dict[str, Any]]:
         """Get images ordered by ranking per algo-update.yaml ordering spec."""
+        z = self.config['confidence_z']
         stmt = select(
             Image.sha256,
             Image.mu,
             Image.sigma,
-            Image.exposures
+            Image.exposures,
+            (Image.mu - z * Image.sigma).label('ci_lower'),  # CI computed by the database
+            (Image.mu + z * Image.sigma).label('ci_upper')
         ).order_by(
             desc(Image.mu),  # ORDER BY mu DESC
             asc(Image.sigma),  # sigma ASC  
@@ -97,12 +101,23 @@ class ConvergenceService:
                 'sigma': row.sigma,
                 'exposures': row.exposures,
                 'rank': idx + 1,
-                'ci_lower': row.mu - self.config['confidence_z'] * row.sigma,
-                'ci_upper': row.mu + self.config['confidence_z'] * row.sigma
+                'ci_lower': row.ci_lower,
+                'ci_upper': row.ci_upper
             }
             for idx, row in enumerate(results)
         ]
     
+    def _column(self, ordered_images: List[Dict[str, Any]], key: str) -> np.ndarray:
+        """Extract one numeric ranking field as a float64 array."""
+        return np.fromiter((img[key] for img in ordered_images), dtype=np.float64, count=len(ordered_images))
+    
+    def _ranking_arrays(self, ordered_images: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Build the mu/sigma/CI column arrays once per convergence computation."""
+        return {
+            key: self._column(ordered_images, key)
+            for key in ('mu', 'sigma', 'ci_lower', 'ci_upper')
+        }
+    
     def _compute_coverage(self) -> Dict[str, Any]:
         """Compute coverage metrics per algo-update.yaml coverage spec."""
         # Count unseen images (exposures = 0)
@@ -123,7 +138,8 @@ class ConvergenceService:
             'coverage_complete': unseen_count == 0
         }
     
-    def _analyze_top_k(self, ordered_images: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_top_k(self, ordered_images: List[Dict[str, Any]],
+                       ranking: Dict[str, np.ndarray]) -> Dict[str, Any]:
         """Analyze top-K selection and properties."""
         k = self.config['target_top_k']
         if k is None or k > len(ordered_images):
@@ -132,8 +148,8 @@ class ConvergenceService:
         top_k = ordered_images[:k] if k > 0 else []
         
         # Get median mu for natural threshold
-        all_mus = [img['mu'] for img in ordered_images]
-        median_mu = statistics.median(all_mus) if all_mus else 1500.0
+        all_mus = ranking['mu']
+        median_mu = float(np.median(all_mus)) if all_mus.size else 1500.0
         
         # SHA256 list for stability tracking
         top_k_sha256s = [img['sha256'] for img in top_k]
@@ -145,7 +161,8 @@ class ConvergenceService:
             'top_k_images': top_k
         }
     
-    def _analyze_boundary_gap(self, ordered_images: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_boundary_gap(self, ordered_images: List[Dict[str, Any]],
+                              ranking: Dict[str, np.ndarray]) -> Dict[str, Any]:
         """Analyze boundary gap per algo-update.yaml boundary spec."""
         k = self.config['target_top_k']
         if k is None or k >= len(ordered_images):
@@ -157,23 +174,19 @@ class ConvergenceService:
                 'k_plus_1_image': None
             }
         
-        k_image = ordered_images[k-1]  # k-th image (0-indexed)
-        k_plus_1_image = ordered_images[k] if k < len(ordered_images) else None
+        # k < len(ordered_images) here, so both boundary ranks exist
+        sigma = ranking['sigma']
         
-        if k_plus_1_image is None:
-            boundary_gap = float('inf')
-            boundary_sigmas = [k_image['sigma'], 0]
-        else:
-            # boundary_gap = ci_lower(k) - ci_upper(k+1)
-            boundary_gap = k_image['ci_lower'] - k_plus_1_image['ci_upper']
-            boundary_sigmas = [k_image['sigma'], k_plus_1_image['sigma']]
+        # boundary_gap = ci_lower(k) - ci_upper(k+1), indexed directly off the arrays
+        boundary_gap = float(ranking['ci_lower'][k-1] - ranking['ci_upper'][k])
+        boundary_sigmas = [float(sigma[k-1]), float(sigma[k])]
         
         return {
             'boundary_gap': boundary_gap,
             'boundary_sigmas': boundary_sigmas,
             'max_boundary_sigma': max(boundary_sigmas),
-            'k_image': k_image,
-            'k_plus_1_image': k_plus_1_image
+            'k_image': ordered_images[k-1],  # k-th image (0-indexed)
+            'k_plus_1_image': ordered_images[k]
         }
     
     def _analyze_stability(self, current_round: int) -> Dict[str, Any]:
@@ -203,14 +216,15 @@ class ConvergenceService:
         exposures_floor_met = True  # Placeholder - would check exposures around rank k
         
         # confidence_separation: boundary_gap >= min_boundary_gap AND max(boundary_sigmas) <= sigma_confident_max
+        config = self.config
         confidence_separation = (
-            boundary['boundary_gap'] >= self.config['min_boundary_gap'] and
-            boundary['max_boundary_sigma'] <= self.config['sigma_confident_max']
+            boundary['boundary_gap'] >= config['min_boundary_gap'] and
+            boundary['max_boundary_sigma'] <= config['sigma_confident_max']
         )
         
         # stability_attained: topk_swaps_last_window <= max_rank_swaps_in_window
         stability_attained = (
-            stability['top_k_swaps_in_window'] <= self.config['max_rank_swaps_in_window']
+            stability['top_k_swaps_in_window'] <= config['max_rank_swaps_in_window']
         )
         
         return {
@@ -299,8 +313,8 @@ class ConvergenceService:
         
         # Exposure Progress (25%): Images with sufficient exposures
         ordered_images = self._get_ordered_images()
-        well_exposed = sum(1 for img in ordered_images 
-                          if img['exposures'] >= self.config['min_exposures_per_image'])
+        exposures = self._column(ordered_images, 'exposures')
+        well_exposed = int(np.count_nonzero(exposures >= self.config['min_exposures_per_image']))
         exposure_progress = (well_exposed / max(1, len(ordered_images))) * 100
         
         # Confidence Progress (25%): Boundary separation and sigma reduction
@@ -401,25 +415,32 @@ class ConvergenceService:
 
     def _generate_ui_signals(self, boundary: Dict[str, Any], stability: Dict[str, Any]) -> Dict[str, Any]:
         """Generate UI progress meters per algo-update.yaml ui_signals spec."""
+        gap = boundary['boundary_gap']
+        max_sigma = boundary['max_boundary_sigma']
+        swaps = stability['top_k_swaps_in_window']
+        min_gap = self.config['min_boundary_gap']
+        sigma_max = self.config['sigma_confident_max']
+        max_swaps = self.config['max_rank_swaps_in_window']
+        
         return {
             'meters': [
                 {
                     'name': 'Confidence gap',
-                    'value': boundary['boundary_gap'],
-                    'target': self.config['min_boundary_gap'],
-                    'progress': min(100, boundary['boundary_gap'] / self.config['min_boundary_gap'] * 100)
+                    'value': gap,
+                    'target': min_gap,
+                    'progress': min(100, gap / min_gap * 100)
                 },
                 {
                     'name': 'Uncertainty σ @ boundary',
-                    'value': boundary['max_boundary_sigma'],
-                    'target': self.config['sigma_confident_max'],
-                    'progress': min(100, (self.config['sigma_confident_max'] - boundary['max_boundary_sigma']) / self.config['sigma_confident_max'] * 100)
+                    'value': max_sigma,
+                    'target': sigma_max,
+                    'progress': min(100, (sigma_max - max_sigma) / sigma_max * 100)
                 },
                 {
                     'name': 'Stability (Top-K swaps)',
-                    'value': stability['top_k_swaps_in_window'],
-                    'target': self.config['max_rank_swaps_in_window'],
-                    'progress': min(100, (self.config['max_rank_swaps_in_window'] - stability['top_k_swaps_in_window']) / max(1, self.config['max_rank_swaps_in_window']) * 100)
+                    'value': swaps,
+                    'target': max_swaps,
+                    'progress': min(100, (max_swaps - swaps) / max(1, max_swaps) * 100)
                 }
             ]
         }
\ No newline at end of file
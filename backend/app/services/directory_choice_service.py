@@ -1,11 +1,11 @@
 import random
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, case, func
 from ..models.image import Image
 from ..models.choice import Choice
 from ..models.app_state import AppState
-from ..models.user import User
+from .choice_service import ChoiceService
 
 
 class DirectoryChoiceService:
@@ -16,15 +16,7 @@ class DirectoryChoiceService:
     
     def ensure_default_user(self) -> str:
         """Ensure a default user exists and return its ID."""
-        stmt = select(User)
-        user = self.db.execute(stmt).scalar_one_or_none()
-        
-        if not user:
-            user = User()
-            self.db.add(user)
-            self.db.commit()
-        
-        return str(user.id)
+        return ChoiceService(self.db).ensure_default_user()
     
     def record_choice(self, left_sha256: str, right_sha256: str, selection: str, user_id: str, round_num: int) -> int:
         """
@@ -80,6 +72,100 @@ class DirectoryChoiceService:
         self.db.commit()
         return next_round
     
+    def record_choices(self, choices: List[Dict[str, Any]]) -> int:
+        """
+        Record a batch of choices (bulk import, replay) with a single commit.
+        
+        Uses one SELECT for the affected images, one bulk INSERT for missing
+        image records and choices, and one UPDATE for all counters.
+        
+        Args:
+            choices: Dicts with "round", "left_sha256", "right_sha256" and
+                "selection" ("LEFT", "RIGHT", or "SKIP")
+            
+        Returns:
+            int: Next round number
+        """
+        if not choices:
+            return self._get_current_round()
+        
+        sha256s = {c["left_sha256"] for c in choices} | {c["right_sha256"] for c in choices}
+        
+        # Ensure image records exist for statistics tracking
+        stmt = select(Image.sha256).where(Image.sha256.in_(sha256s))
+        existing = set(self.db.execute(stmt).scalars())
+        missing = sha256s - existing
+        if missing:
+            self.db.execute(insert(Image), [
+                {"sha256": sha256, "exposures": 0, "likes": 0, "unlikes": 0, "skips": 0}
+                for sha256 in missing
+            ])
+        
+        # Accumulate per-image counter deltas in memory
+        deltas = {sha256: {"exposures": 0, "likes": 0, "unlikes": 0, "skips": 0} for sha256 in sha256s}
+        next_eligible = {}
+        current_round = None
+        choice_rows = []
+        
+        for c in choices:
+            left, right, selection = c["left_sha256"], c["right_sha256"], c["selection"]
+            deltas[left]["exposures"] += 1
+            deltas[right]["exposures"] += 1
+            
+            if selection == "LEFT":
+                deltas[left]["likes"] += 1
+                deltas[right]["unlikes"] += 1
+                winner_sha256 = left
+            elif selection == "RIGHT":
+                deltas[right]["likes"] += 1
+                deltas[left]["unlikes"] += 1
+                winner_sha256 = right
+            elif selection == "SKIP":
+                deltas[left]["skips"] += 1
+                deltas[right]["skips"] += 1
+                winner_sha256 = None
+                
+                # Set requeue rounds for skipped images
+                if current_round is None:
+                    current_round = self._get_current_round()
+                next_eligible[left] = current_round + random.randint(11, 49)
+                next_eligible[right] = current_round + random.randint(11, 49)
+            else:
+                raise ValueError(f"Invalid selection: {selection}")
+            
+            choice_rows.append({
+                "round": c["round"],
+                "left_sha256": left,
+                "right_sha256": right,
+                "winner_sha256": winner_sha256,
+                "skipped": selection == "SKIP"
+            })
+        
+        self.db.execute(insert(Choice), choice_rows)
+        
+        # One UPDATE for every touched image, with per-row deltas as CASE expressions
+        values = {
+            column: func.coalesce(getattr(Image, column), 0) + case(
+                {sha256: delta[column] for sha256, delta in deltas.items()},
+                value=Image.sha256,
+                else_=0
+            )
+            for column in ("exposures", "likes", "unlikes", "skips")
+        }
+        if next_eligible:
+            values["next_eligible_round"] = case(
+                next_eligible, value=Image.sha256, else_=Image.next_eligible_round
+            )
+        
+        update_stmt = update(Image).where(Image.sha256.in_(sha256s)).values(**values)
+        self.db.execute(update_stmt.execution_options(synchronize_session=False))
+        
+        # Increment round counter once for the whole batch
+        next_round = self._increment_round(len(choices))
+        
+        self.db.commit()
+        return next_round
+    
     def _ensure_image_record(self, sha256: str) -> Image:
         """Ensure an image record exists for statistics tracking."""
         stmt = select(Image).where(Image.sha256 == sha256)
@@ -101,27 +187,20 @@ class DirectoryChoiceService:
     
     def _get_current_round(self) -> int:
         """Get the current round number."""
-        stmt = select(AppState).where(AppState.key == "current_round")
-        state = self.db.execute(stmt).scalar_one_or_none()
+        stmt = select(AppState.round).where(AppState.id == 1)
+        return self.db.execute(stmt).scalar_one_or_none() or 0
+    
+    def _increment_round(self, count: int = 1) -> int:
+        """Atomically increment by count and return the new round number."""
+        # Increment in place and read the new value back in the same statement
+        stmt = update(AppState).where(AppState.id == 1).values(
+            round=AppState.round + count
+        ).returning(AppState.round).execution_options(synchronize_session=False)
+        next_round = self.db.execute(stmt).scalar_one_or_none()
         
-        if not state:
-            state = AppState(key="current_round", val={"current_round": 0})
-            self.db.add(state)
-            self.db.commit()
-            return 0
+        if next_round is None:
+            # Initialize if missing (should not happen with migration)
+            next_round = count
+            self.db.add(AppState(id=1, round=next_round))
         
-        return state.val.get("current_round", 0)
-    
-    def _increment_round(self) -> int:
-        """Increment and return the new round number."""
-        stmt = select(AppState).where(AppState.key == "current_round")
-        state = self.db.execute(stmt).scalar_one_or_none()
-        
-        if state:
-            current = state.val.get("current_round", 0)
-            state.val = {"current_round": current + 1}
-        else:
-            state = AppState(key="current_round", val={"current_round": 1})
-            self.db.add(state)
-        
-        return state.val["current_round"]
\ No newline at end of file
+        return next_round
@@ -1,9 +1,25 @@
 import os
-from typing import Dict, Optional, Set
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, func
 from ..models.image import Image
 
+# Seconds a successful existence check is trusted before the path is stat'ed again
+PATH_RECHECK_SECONDS = 60.0
+
+# Max paths remembered in _verified_paths; least recently checked are evicted past this
+VERIFIED_PATHS_MAX_ENTRIES = 50_000
+
+# Paths confirmed to exist on disk -> monotonic time of the check (shared across requests, LRU)
+_verified_paths: 'OrderedDict[str, float]' = OrderedDict()
+
+
+def clear_verified_paths() -> None:
+    """Forget every cached existence check, e.g. after uploads are deleted."""
+    _verified_paths.clear()
+
 
 class DirectoryService:
     """Directory service for uploaded images in /app/uploads directory."""
@@ -12,43 +28,102 @@ class DirectoryService:
         self.db = db
         self.root_directory = "/app/uploads"
         self.supported_extensions = [".jpg", ".jpeg", ".png", ".webp", ".gif"]
+        # sha256 -> resolved path, for the life of this service (one request)
+        self._path_cache: Dict[str, str] = {}
         # Ensure upload directory exists
         os.makedirs(self.root_directory, exist_ok=True)
     
     def get_path_by_sha256(self, sha256: str) -> Optional[str]:
         """Get file path by SHA256, checking database first then filesystem."""
+        cached = self._path_cache.get(sha256)
+        if cached is not None:
+            return cached
+        
         # First check database for exact file_path
         stmt = select(Image.file_path).where(Image.sha256 == sha256)
         result = self.db.execute(stmt).scalar_one_or_none()
         
-        if result and os.path.exists(result):
-            return result
+        file_path = self._resolve_path(sha256, result)
+        if file_path:
+            self._path_cache[sha256] = file_path
+        return file_path
+    
+    def get_paths_by_sha256(self, sha256s: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Get file paths for many SHA256s with a single database round-trip.
+        
+        Passing None resolves every image. SHA256s without a file on disk are omitted.
+        """
+        stmt = select(Image.sha256, Image.file_path)
+        if sha256s is not None:
+            sha256s = list(sha256s)
+            stmt = stmt.where(Image.sha256.in_(sha256s))
+        db_paths = dict(self.db.execute(stmt).all())
+        
+        paths = {}
+        for sha256 in (db_paths if sha256s is None else sha256s):
+            file_path = self._resolve_path(sha256, db_paths.get(sha256))
+            if file_path:
+                paths[sha256] = file_path
+        self._path_cache.update(paths)
+        return paths
+    
+    def _resolve_path(self, sha256: str, db_path: Optional[str]) -> Optional[str]:
+        """Resolve a SHA256 to a file on disk, preferring its stored file_path."""
+        if db_path and self._path_exists(db_path):
+            return db_path
         
         # Fallback: Try different extensions to find the file (both lowercase and uppercase)
         for ext in self.supported_extensions:
             # Try lowercase extension
             file_path = os.path.join(self.root_directory, f"{sha256}{ext}")
-            if os.path.exists(file_path):
+            if self._path_exists(file_path):
                 return file_path
             
             # Try uppercase extension
             file_path = os.path.join(self.root_directory, f"{sha256}{ext.upper()}")
-            if os.path.exists(file_path):
+            if self._path_exists(file_path):
                 return file_path
         return None
     
+    def _path_exists(self, file_path: str) -> bool:
+        """Check a path exists, trusting a recent positive check instead of stat'ing again."""
+        now = time.monotonic()
+        checked_at = _verified_paths.get(file_path)
+        if checked_at is not None and now - checked_at < PATH_RECHECK_SECONDS:
+            return True
+        
+        if os.path.exists(file_path):
+            _verified_paths[file_path] = now
+            _verified_paths.move_to_end(file_path)
+            if len(_verified_paths) > VERIFIED_PATHS_MAX_ENTRIES:
+                _verified_paths.popitem(last=False)
+            return True
+        
+        _verified_paths.pop(file_path, None)
+        return False
+    
     def get_all_sha256s(self) -> Set[str]:
-        """Get all SHA256s from database (uploaded images)."""
-        from sqlalchemy import select
+        """
+        Get all SHA256s from database (uploaded images).
+        
+        This is the expensive path: it materializes every key in the table.
+        Callers that only need a count should use count_images() instead.
+        """
         stmt = select(Image.sha256)
-        result = self.db.execute(stmt)
+        result = self.db.execute(stmt).yield_per(1000)
         return {row[0] for row in result}
     
+    def count_images(self) -> int:
+        """Count uploaded images without loading their SHA256s."""
+        stmt = select(func.count(Image.sha256))
+        return self.db.execute(stmt).scalar() or 0
+    
     def get_cache_info(self) -> Dict[str, any]:
         """Get information about uploaded images."""
-        all_sha256s = self.get_all_sha256s()
+        total_images = self.count_images()
         return {
             "root_directory": self.root_directory,
-            "total_images": len(all_sha256s),
-            "cache_entries": len(all_sha256s)
+            "total_images": total_images,
+            "cache_entries": total_images
         }
\ No newline at end of file
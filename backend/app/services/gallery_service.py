@@ -3,10 +3,10 @@ Gallery system implementing algo-update.yaml section 7.
 """
 import statistics
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, desc, asc, text, delete
-from ..models.image import Image
+from sqlalchemy import Row, select, func, desc, asc, delete, insert, literal, update
+from ..models.image import Image, CI_LOWER_Z
 from ..models.gallery import Gallery, GalleryImage
 from ..models.duplicate import Duplicate
 from ..models.app_state import AppState
@@ -16,8 +16,12 @@ from ..core.config import settings
 class GalleryService:
     """Gallery management service per algo-update.yaml specification."""
     
+    # Candidate rows fetched per round-trip (and per duplicates lookup) when building a gallery
+    CANDIDATE_BATCH_SIZE = 1000
+    
     def __init__(self, db: Session):
         self.db = db
+        self._current_round: Optional[int] = None  # read once per request
     
     def create_gallery(self, name: str, selection_policy: str, 
                       selection_params: Dict[str, Any], 
@@ -42,23 +46,29 @@ class GalleryService:
         self.db.add(gallery)
         self.db.flush()  # Get ID
         
-        # Insert gallery images with dense ranking
-        gallery_images = [
-            GalleryImage(
-                gallery_id=gallery.id,
-                sha256=candidate['sha256'],
-                rank=rank + 1  # Dense ranking starts at 1
-            )
-            for rank, candidate in enumerate(candidates)
-        ]
-        
-        self.db.add_all(gallery_images)
+        # Insert gallery images with dense ranking, as one Core executemany rather than per-row ORM objects
+        if candidates:
+            self.db.execute(insert(GalleryImage.__table__), [
+                {
+                    'gallery_id': gallery.id,
+                    'sha256': candidate.sha256,
+                    'rank': rank + 1  # Dense ranking starts at 1
+                }
+                for rank, candidate in enumerate(candidates)
+            ])
         self.db.commit()
         
-        # Return sample for response
-        sample = candidates[:5] if len(candidates) > 5 else candidates
-        for i, img in enumerate(sample):
-            img['rank'] = i + 1
+        # Return sample for response; only these rows are turned into dicts
+        sample = [
+            {
+                'sha256': row.sha256,
+                'mu': row.mu,
+                'sigma': row.sigma,
+                'exposures': row.exposures,
+                'rank': i + 1
+            }
+            for i, row in enumerate(candidates[:5])
+        ]
         
         return {
             'gallery_id': gallery.id,
@@ -70,13 +80,16 @@ class GalleryService:
     
     def list_galleries(self) -> List[Dict[str, Any]]:
         """List all galleries with summary info."""
+        # Correlated count per gallery, answered from the (gallery_id, rank) index
+        size_stmt = select(func.count()).select_from(GalleryImage).where(
+            GalleryImage.gallery_id == Gallery.id
+        ).correlate(Gallery).scalar_subquery()
+        
         stmt = select(
             Gallery.id,
             Gallery.name,
             Gallery.created_at,
-            func.count(GalleryImage.sha256).label('size')
-        ).outerjoin(GalleryImage).group_by(
-            Gallery.id, Gallery.name, Gallery.created_at
+            size_stmt.label('size')
         ).order_by(desc(Gallery.created_at))
         
         results = self.db.execute(stmt).fetchall()
@@ -94,8 +107,7 @@ class GalleryService:
     def get_gallery(self, gallery_id: int) -> Optional[Dict[str, Any]]:
         """Get gallery with all images."""
         # Get gallery info
-        gallery_stmt = select(Gallery).where(Gallery.id == gallery_id)
-        gallery = self.db.execute(gallery_stmt).scalar_one_or_none()
+        gallery = self.db.get(Gallery, gallery_id)
         
         if not gallery:
             return None
@@ -141,8 +153,7 @@ class GalleryService:
         """Update gallery (rename, add/remove images, re-rank)."""
         
         # Check gallery exists
-        gallery_stmt = select(Gallery).where(Gallery.id == gallery_id)
-        gallery = self.db.execute(gallery_stmt).scalar_one_or_none()
+        gallery = self.db.get(Gallery, gallery_id)
         
         if not gallery:
             return False
@@ -159,28 +170,18 @@ class GalleryService:
             )
             self.db.execute(delete_stmt)
         
-        # Add image if specified (get its current stats)
+        # Add image if specified: one INSERT ... SELECT that appends it at the next rank,
+        # inserting nothing if the image does not exist
         if add_sha256:
-            # Check if image exists
-            image_stmt = select(Image.mu, Image.sigma, Image.exposures).where(
-                Image.sha256 == add_sha256
-            )
-            image_data = self.db.execute(image_stmt).first()
+            next_rank = select(func.coalesce(func.max(GalleryImage.rank), 0) + 1).where(
+                GalleryImage.gallery_id == gallery_id
+            ).scalar_subquery()
             
-            if image_data:
-                # Get next rank
-                max_rank_stmt = select(func.max(GalleryImage.rank)).where(
-                    GalleryImage.gallery_id == gallery_id
-                )
-                max_rank = self.db.execute(max_rank_stmt).scalar() or 0
-                
-                # Add to gallery
-                new_gallery_image = GalleryImage(
-                    gallery_id=gallery_id,
-                    sha256=add_sha256,
-                    rank=max_rank + 1
-                )
-                self.db.add(new_gallery_image)
+            add_stmt = insert(GalleryImage.__table__).from_select(
+                ['gallery_id', 'sha256', 'rank'],
+                select(literal(gallery_id), Image.sha256, next_rank).where(Image.sha256 == add_sha256)
+            )
+            self.db.execute(add_stmt)
         
         # Re-rank if requested
         if re_rank:
@@ -193,8 +194,7 @@ class GalleryService:
         """Delete gallery and all its images."""
         
         # Check gallery exists
-        gallery_stmt = select(Gallery).where(Gallery.id == gallery_id)
-        gallery = self.db.execute(gallery_stmt).scalar_one_or_none()
+        gallery = self.db.get(Gallery, gallery_id)
         
         if not gallery:
             return False
@@ -205,14 +205,15 @@ class GalleryService:
         return True
     
     def _get_current_round(self) -> int:
-        """Get current round from app state."""
-        stmt = select(AppState.round).where(AppState.id == 1)
-        result = self.db.execute(stmt).scalar()
-        return result or 0
+        """Get current round from app state, memoized for the life of this service."""
+        if self._current_round is None:
+            stmt = select(AppState.round).where(AppState.id == 1)
+            self._current_round = self.db.execute(stmt).scalar() or 0
+        return self._current_round
     
     def _select_candidates(self, selection_policy: str, selection_params: Dict[str, Any],
-                          duplicates_policy: str) -> List[Dict[str, Any]]:
-        """Select candidate images based on policy."""
+                          duplicates_policy: str) -> List[Row]:
+        """Select candidate images based on policy, as (sha256, mu, sigma, exposures) rows in rank order."""
         
         # Base query: all non-archived images ordered per algo-update.yaml
         base_stmt = select(
@@ -240,9 +241,9 @@ class GalleryService:
         elif selection_policy == "threshold_ci":
             z = selection_params.get('z', settings.confidence_z)
             min_ci_lower = selection_params.get('min_ci_lower', 1500)
-            base_stmt = base_stmt.where(
-                (Image.mu - z * Image.sigma) >= min_ci_lower
-            )
+            # The stored ci_lower column is indexed; other z values fall back to the expression
+            ci_lower = Image.ci_lower if z == CI_LOWER_Z else (Image.mu - z * Image.sigma)
+            base_stmt = base_stmt.where(ci_lower >= min_ci_lower)
         elif selection_policy == "manual":
             sha256_list = selection_params.get('sha256_list', [])
             if sha256_list:
@@ -253,100 +254,89 @@ class GalleryService:
         else:
             raise ValueError(f"Unknown selection policy: {selection_policy}")
         
-        candidates = self.db.execute(base_stmt).fetchall()
+        # Stream candidates through a server-side cursor and apply the duplicates policy per batch
+        result = self.db.execute(base_stmt.execution_options(yield_per=self.CANDIDATE_BATCH_SIZE))
+        candidates = []
+        seen_sha256s = set()
+        for batch in result.partitions():
+            candidates.extend(self._apply_duplicates_policy(batch, duplicates_policy, seen_sha256s))
         
-        # Apply duplicates policy
-        if duplicates_policy == "collapse_to_canonical":
-            # Collapse duplicates to their canonical representations
-            canonical_candidates = []
-            seen_sha256s = set()
-            
-            for row in candidates:
-                # Check if this is a duplicate
-                canonical_stmt = select(Duplicate.canonical_sha256).where(
-                    Duplicate.duplicate_sha256 == row.sha256
-                )
-                canonical_sha256 = self.db.execute(canonical_stmt).scalar()
-                
-                # Use canonical if it's a duplicate, otherwise use original
-                final_sha256 = canonical_sha256 or row.sha256
-                
-                # Only include each canonical once
-                if final_sha256 not in seen_sha256s:
-                    # Get stats for the canonical image
-                    if canonical_sha256:
-                        canonical_stmt = select(
-                            Image.sha256, Image.mu, Image.sigma, Image.exposures
-                        ).where(Image.sha256 == canonical_sha256)
-                        canonical_row = self.db.execute(canonical_stmt).first()
-                        if canonical_row:
-                            canonical_candidates.append(canonical_row)
-                            seen_sha256s.add(final_sha256)
-                    else:
-                        canonical_candidates.append(row)
-                        seen_sha256s.add(final_sha256)
-            
-            candidates = canonical_candidates
-            
-        elif duplicates_policy == "exclude_duplicates":
+        return candidates
+    
+    def _apply_duplicates_policy(self, rows: List[Row], duplicates_policy: str,
+                                 seen_sha256s: Set[str]) -> List[Row]:
+        """
+        Apply the duplicates policy to one batch of candidate rows.
+        
+        seen_sha256s carries the canonicals already emitted by earlier batches.
+        """
+        if duplicates_policy not in ("collapse_to_canonical", "exclude_duplicates"):
+            # "include_duplicates" - no filtering needed
+            return rows
+        
+        # One lookup for every candidate's canonical mapping in this batch
+        duplicate_stmt = select(Duplicate.duplicate_sha256, Duplicate.canonical_sha256).where(
+            Duplicate.duplicate_sha256.in_([row.sha256 for row in rows])
+        )
+        canonical_by_sha256 = dict(self.db.execute(duplicate_stmt).all())
+        
+        if duplicates_policy == "exclude_duplicates":
             # Only include canonical images (exclude duplicates entirely)
-            filtered_candidates = []
-            for row in candidates:
-                # Check if this is a duplicate - if so, skip it
-                duplicate_stmt = select(Duplicate.canonical_sha256).where(
-                    Duplicate.duplicate_sha256 == row.sha256
-                )
-                is_duplicate = self.db.execute(duplicate_stmt).scalar() is not None
-                
-                if not is_duplicate:
-                    filtered_candidates.append(row)
+            return [row for row in rows if row.sha256 not in canonical_by_sha256]
+        
+        # Collapse duplicates to their canonical representations
+        canonical_rows = {}
+        if canonical_by_sha256:
+            # Get stats for all canonical images at once
+            canonical_stmt = select(
+                Image.sha256, Image.mu, Image.sigma, Image.exposures
+            ).where(Image.sha256.in_(set(canonical_by_sha256.values())))
+            canonical_rows = {row.sha256: row for row in self.db.execute(canonical_stmt)}
+        
+        canonical_candidates = []
+        for row in rows:
+            # Use canonical if it's a duplicate, otherwise use original
+            canonical_sha256 = canonical_by_sha256.get(row.sha256)
+            final_sha256 = canonical_sha256 or row.sha256
+            
+            # Only include each canonical once
+            if final_sha256 in seen_sha256s:
+                continue
             
-            candidates = filtered_candidates
-        # "include_duplicates" - no filtering needed
+            final_row = canonical_rows.get(canonical_sha256) if canonical_sha256 else row
+            if final_row:
+                canonical_candidates.append(final_row)
+                seen_sha256s.add(final_sha256)
         
-        return [
-            {
-                'sha256': row.sha256,
-                'mu': row.mu,
-                'sigma': row.sigma,
-                'exposures': row.exposures
-            }
-            for row in candidates
-        ]
+        return canonical_candidates
     
     def _rerank_gallery(self, gallery_id: int):
         """Re-rank gallery images based on current ratings."""
         
-        # Get current images with their stats
-        stmt = select(
+        # Rank the gallery's images with ROW_NUMBER() in the database and write them back in one UPDATE ... FROM
+        ranked = select(
             GalleryImage.sha256,
-            Image.mu,
-            Image.sigma,
-            Image.exposures
+            func.row_number().over(
+                order_by=(
+                    desc(Image.mu),
+                    asc(Image.sigma),
+                    desc(Image.exposures),
+                    asc(Image.sha256)
+                )
+            ).label('rank')
         ).select_from(
             GalleryImage
         ).join(
             Image, GalleryImage.sha256 == Image.sha256
         ).where(
             GalleryImage.gallery_id == gallery_id
-        ).order_by(
-            desc(Image.mu),
-            asc(Image.sigma),
-            desc(Image.exposures),
-            asc(Image.sha256)
-        )
+        ).subquery('ranked')
+        
+        update_stmt = update(GalleryImage).where(
+            GalleryImage.gallery_id == gallery_id,
+            GalleryImage.sha256 == ranked.c.sha256
+        ).values(
+            rank=ranked.c.rank
+        ).execution_options(synchronize_session=False)
         
-        images = self.db.execute(stmt).fetchall()
-        
-        # Update ranks
-        for rank, img in enumerate(images, 1):
-            update_stmt = text("""
-                UPDATE gallery_images 
-                SET rank = :rank
-                WHERE gallery_id = :gallery_id AND sha256 = :sha256
-            """)
-            self.db.execute(update_stmt, {
-                'rank': rank,
-                'gallery_id': gallery_id,
-                'sha256': img.sha256
-            })
\ No newline at end of file
+        self.db.execute(update_stmt)
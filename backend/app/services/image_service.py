@@ -1,22 +1,44 @@
 import os
-from typing import List, Tuple
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, func
 from ..models.image import Image
+from ..models.duplicate import Duplicate
 from ..utils.image_utils import (
-    get_sha256_hash,
-    get_image_dimensions, 
-    get_mime_type,
-    encode_image_to_base64,
+    get_sha256_digest,
     is_supported_image,
-    get_file_size
+    probe_image
 )
 from ..core.config import settings
 
+# Files handed to each hashing worker per round-trip, to amortize IPC overhead
+HASH_CHUNKSIZE = 16
+
+# Max digests kept per memo; least recently used entries are evicted past this
+HASH_MEMO_MAX_ENTRIES = 100_000
+
+
+def _try_sha256_digest(file_path: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """Hash a file in a worker process, returning the error instead of raising it."""
+    try:
+        return get_sha256_digest(file_path), None
+    except Exception as e:
+        return None, str(e)
+
 
 class ImageService:
     """Service for image ingestion and management."""
     
+    # (path, size, mtime_ns) -> raw sha256 digest, shared across requests as a bounded LRU
+    _hash_memo: 'OrderedDict[Tuple[str, int, int], bytes]' = OrderedDict()
+    # (st_dev, st_ino, size, mtime_ns) -> raw sha256 digest, so moved/renamed files on the same volume skip hashing
+    _inode_memo: 'OrderedDict[Tuple[int, int, int, int], bytes]' = OrderedDict()
+    
+    # Max sha256s per IN (...) when preloading known images
+    LOOKUP_BATCH_SIZE = 5000
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -37,13 +59,15 @@ class ImageService:
             raise ValueError("Directory path not allowed")
         
         image_files = self._scan_directory(abs_directory)
+        file_hashes = self._hash_files(image_files)
+        known_images, known_paths = self._load_known_images(set(file_hashes.values()))
         
         ingested = 0
         duplicates = 0
         existing = 0
         
-        for file_path in image_files:
-            result = self._process_image_file(file_path)
+        for file_path, sha256_hash in file_hashes.items():
+            result = self._process_image_file(file_path, sha256_hash, known_images, known_paths)
             if result == "ingested":
                 ingested += 1
             elif result == "duplicate":
@@ -54,67 +78,155 @@ class ImageService:
         self.db.commit()
         return ingested, duplicates, existing
     
-    def _scan_directory(self, directory: str) -> List[str]:
-        """Recursively scan directory for supported image files."""
-        image_files = []
-        
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if is_supported_image(file_path, settings.supported_formats):
-                    # Check file size limit
-                    file_size = get_file_size(file_path)
-                    max_size = settings.max_image_mb * 1024 * 1024
-                    if file_size <= max_size:
-                        image_files.append(file_path)
+    def _scan_directory(self, directory: str) -> Dict[str, os.stat_result]:
+        """Recursively scan directory for supported image files, keyed by path with their stat."""
+        image_files = {}
+        max_size = settings.max_image_mb * 1024 * 1024
+        
+        for entry in self._iter_files(directory):
+            # Check file size limit from the stat cached on the DirEntry
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_size > max_size:
+                continue
+            # _list_directory only returns regular files, so skip is_supported_image's stat
+            if is_supported_image(entry.path, settings.supported_formats, is_file=True):
+                image_files[entry.path] = stat
         
         return image_files
     
-    def _process_image_file(self, file_path: str) -> str:
+    def _iter_files(self, directory: str) -> Iterator[os.DirEntry]:
+        """
+        Yield regular files below directory, skipping hidden directories and symlinks.
+        
+        Directory listing is I/O-bound, so each subdirectory is scanned on a thread
+        pool as soon as it is discovered rather than walking the tree serially.
+        """
+        with ThreadPoolExecutor() as executor:
+            pending = {executor.submit(self._list_directory, directory)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subdirectories, files = future.result()
+                    pending.update(executor.submit(self._list_directory, path) for path in subdirectories)
+                    yield from files
+    
+    @staticmethod
+    def _list_directory(directory: str) -> Tuple[List[str], List[os.DirEntry]]:
+        """
+        Scan one directory, returning its visible subdirectories and its regular files.
+        
+        Unreadable directories and entries that vanish or can't be stat'd are skipped,
+        as os.walk did.
+        """
+        subdirectories = []
+        files = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                subdirectories.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            # Warm the DirEntry stat cache here so the stat syscall runs on the worker
+                            entry.stat(follow_symlinks=False)
+                            files.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirectories, files
+    
+    def _hash_files(self, image_files: Dict[str, os.stat_result]) -> Dict[str, str]:
+        """
+        Hash files in parallel across processes (SHA-256 is CPU-bound).
+        
+        Files whose (path, size, mtime) are unchanged since they were last hashed,
+        or that were moved/renamed within the same volume, reuse the memoized
+        digest instead of being read again. Digests are kept as raw bytes and
+        only converted to hex on the way out.
+        
+        Returns:
+            Dict[str, str]: file path -> sha256, in scan order; unreadable files are left out
+        """
+        digests = {}
+        pending = {}
+        for file_path, stat in image_files.items():
+            memo_key = (file_path, stat.st_size, stat.st_mtime_ns)
+            inode_key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            digest = self._hash_memo.get(memo_key) or self._inode_memo.get(inode_key)
+            if digest:
+                digests[file_path] = digest
+                self._remember(self._hash_memo, memo_key, digest)
+            else:
+                pending[file_path] = (memo_key, inode_key)
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=settings.parallel_workers or os.cpu_count()) as executor:
+                results = executor.map(_try_sha256_digest, pending, chunksize=HASH_CHUNKSIZE)
+                for file_path, (digest, error) in zip(pending, results):
+                    if error is not None:
+                        print(f"Error hashing {file_path}: {error}")
+                        continue
+                    digests[file_path] = digest
+                    memo_key, inode_key = pending[file_path]
+                    self._remember(self._hash_memo, memo_key, digest)
+                    self._remember(self._inode_memo, inode_key, digest)
+        
+        return {file_path: digests[file_path].hex() for file_path in image_files if file_path in digests}
+    
+    @staticmethod
+    def _remember(memo: OrderedDict, key: tuple, digest: bytes) -> None:
+        """Store a digest as most recently used, evicting the oldest past HASH_MEMO_MAX_ENTRIES."""
+        memo[key] = digest
+        memo.move_to_end(key)
+        if len(memo) > HASH_MEMO_MAX_ENTRIES:
+            memo.popitem(last=False)
+    
+    def _load_known_images(self, sha256s: Set[str]) -> Tuple[Dict[str, Image], Set[Tuple[str, str]]]:
+        """
+        Preload images matching the scanned hashes, in batches of IN (...) lookups.
+        
+        Returns:
+            Tuple[known_images, known_paths]: sha256 -> first matching image, and the
+            set of (sha256, file_path) pairs already recorded
+        """
+        sha256_list = list(sha256s)
+        known_images = {}
+        known_paths = set()
+        for start in range(0, len(sha256_list), self.LOOKUP_BATCH_SIZE):
+            batch = sha256_list[start:start + self.LOOKUP_BATCH_SIZE]
+            for image in self.db.execute(select(Image).where(Image.sha256.in_(batch))).scalars():
+                known_images.setdefault(image.sha256, image)
+                known_paths.add((image.sha256, image.file_path))
+        return known_images, known_paths
+    
+    def _process_image_file(self, file_path: str, sha256_hash: str,
+                            known_images: Dict[str, Image],
+                            known_paths: Set[Tuple[str, str]]) -> str:
         """
-        Process a single image file.
+        Process a single image file against the preloaded known images.
+        
+        known_images and known_paths are updated with anything created here, so later
+        files in the same ingest see it.
         
         Returns:
             str: "ingested", "duplicate", or "existing"
         """
         try:
-            # Generate hash
-            sha256_hash = get_sha256_hash(file_path)
+            if sha256_hash not in known_images:
+                # New content gets its image row
+                known_images[sha256_hash] = self._create_image(file_path, sha256_hash)
+                known_paths.add((sha256_hash, file_path))
+                return "ingested"
             
-            # Check if image already exists
-            stmt = select(Image).where(Image.sha256 == sha256_hash)
-            existing_image = self.db.execute(stmt).scalar_one_or_none()
+            if (sha256_hash, file_path) in known_paths:
+                return "existing"
             
-            if existing_image:
-                if existing_image.is_canonical:
-                    # Hash exists as canonical, check if this specific file path exists
-                    stmt = select(Image).where(
-                        Image.sha256 == sha256_hash,
-                        Image.file_path == file_path
-                    )
-                    if self.db.execute(stmt).scalar_one_or_none():
-                        return "existing"
-                    else:
-                        # Create duplicate entry
-                        self._create_duplicate_image(file_path, existing_image)
-                        return "duplicate"
-                else:
-                    # Existing image is a duplicate, check if this path exists
-                    stmt = select(Image).where(
-                        Image.sha256 == sha256_hash,
-                        Image.file_path == file_path
-                    )
-                    if self.db.execute(stmt).scalar_one_or_none():
-                        return "existing"
-                    else:
-                        # Get canonical image
-                        canonical = existing_image.canonical or existing_image
-                        self._create_duplicate_image(file_path, canonical)
-                        return "duplicate"
-            else:
-                # Create new canonical image
-                self._create_canonical_image(file_path, sha256_hash)
-                return "ingested"
+            # Byte-identical copy at another path: images are keyed by sha256, so it shares
+            # the recorded row (and can't be a duplicates row, which needs two distinct hashes)
+            known_paths.add((sha256_hash, file_path))
+            return "duplicate"
                 
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
@@ -122,51 +234,26 @@ class ImageService:
             traceback.print_exc()
             return "error"
     
-    def _create_canonical_image(self, file_path: str, sha256_hash: str):
-        """Create a new canonical image record."""
-        width, height = get_image_dimensions(file_path)
-        mime_type = get_mime_type(file_path)
-        file_size = get_file_size(file_path)
+    def _create_image(self, file_path: str, sha256_hash: str) -> Image:
+        """Create a new image record."""
+        probe = probe_image(file_path)
         
         image = Image(
             sha256=sha256_hash,
             file_path=file_path,
-            mime_type=mime_type,
-            width=width,
-            height=height,
-            file_size=file_size,
-            base64_data=b'',  # Empty - we serve files directly
-            is_canonical=True,
-            canonical_id=None
+            width=probe.width,
+            height=probe.height,
+            file_size=probe.size
         )
         
         self.db.add(image)
-    
-    def _create_duplicate_image(self, file_path: str, canonical_image: Image):
-        """Create a duplicate image record pointing to canonical."""
-        mime_type = get_mime_type(file_path)
-        file_size = get_file_size(file_path)
-        
-        duplicate = Image(
-            sha256=canonical_image.sha256,
-            file_path=file_path,
-            mime_type=mime_type,
-            width=canonical_image.width,
-            height=canonical_image.height,
-            file_size=file_size,
-            base64_data=b'',  # Empty - we serve files directly
-            is_canonical=False,
-            canonical_id=canonical_image.id
-        )
-        
-        self.db.add(duplicate)
+        return image
     
     def get_canonical_images(self) -> List[Image]:
-        """Get all canonical images."""
-        stmt = select(Image).where(Image.is_canonical == True)
-        return list(self.db.execute(stmt).scalars().all())
+        """Get all canonical images (one row per sha256, so every image)."""
+        return list(self.db.execute(select(Image)).scalars().all())
     
     def get_duplicate_count(self) -> int:
-        """Get count of duplicate images."""
-        stmt = select(Image).where(Image.is_canonical == False)
-        return len(list(self.db.execute(stmt).scalars().all()))
\ No newline at end of file
+        """Get count of recorded duplicate -> canonical mappings."""
+        stmt = select(func.count()).select_from(Duplicate)
+        return self.db.execute(stmt).scalar() or 0
\ No newline at end of file
@@ -1,29 +1,87 @@
 """
 Sophisticated pairing engine implementing the algo-update.yaml specification.
 """
-import random
-import statistics
+import heapq
 from collections import deque
-from typing import Tuple, Optional, List, Dict, Set
+from typing import Hashable, Iterator, KeysView, NamedTuple, Tuple, Optional, List, Dict, Set
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import select, text, desc, asc
+from sqlalchemy import bindparam, insert, select, case, update, text, desc, asc
 from ..models.image import Image
 from ..models.choice import Choice
 from ..models.app_state import AppState
-from ..utils.elo_utils import EloCalculator, calculate_information_gain
+from ..utils.elo_utils import EloCalculator, calculate_information_gain_matrix
 from ..core.config import settings
 
 
+class PoolImage(NamedTuple):
+    """Pairing view of an image row: what pool selection and the pair response read."""
+    sha256: str
+    mu: float
+    sigma: float
+    exposures: int
+    likes: int
+    unlikes: int
+    skips: int
+    next_eligible_round: Optional[int]
+    is_archived_hard_no: bool
+
+
+# Columns selected for pairing, in PoolImage field order
+POOL_COLUMNS = tuple(getattr(Image, field) for field in PoolImage._fields)
+
+
+def _canon(a: str, b: str) -> Tuple[str, str]:
+    """Order-independent key for a pair of SHA256s (one compare, no list or sort)."""
+    return (a, b) if a < b else (b, a)
+
+
+class RecentRing:
+    """Fixed-size ring of recent items with O(1) membership (a deque plus a count map)."""
+    
+    def __init__(self, maxlen: int):
+        self._items: deque = deque(maxlen=maxlen)
+        self._counts: Dict[Hashable, int] = {}
+    
+    def append(self, item: Hashable):
+        if len(self._items) == self._items.maxlen:
+            if not self._items:
+                return  # zero-length window keeps nothing
+            # The deque is about to drop its oldest item; forget it too
+            evicted = self._items[0]
+            if self._counts[evicted] == 1:
+                del self._counts[evicted]
+            else:
+                self._counts[evicted] -= 1
+        self._items.append(item)
+        self._counts[item] = self._counts.get(item, 0) + 1
+    
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._counts
+    
+    @property
+    def members(self) -> KeysView:
+        """Live set-like view of the distinct items in the window (C-level membership)."""
+        return self._counts.keys()
+    
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._items)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
 class PairingService:
     """Pairing engine with Elo+σ algorithm as per algo-update.yaml spec."""
     
     def __init__(self, db: Session):
         self.db = db
         self.elo_calc = EloCalculator()
+        self.rng = np.random.default_rng()
         
         # Ring buffers for recent suppression (in-memory)
-        self.recent_images: deque = deque(maxlen=settings.recent_image_window)
-        self.recent_pairs: deque = deque(maxlen=settings.recent_pair_window)
+        self.recent_images = RecentRing(settings.recent_image_window)
+        self.recent_pairs = RecentRing(settings.recent_pair_window)
     
     def get_next_pair(self, directory_service) -> Tuple[Optional[Dict], Optional[Dict], int]:
         """
@@ -48,48 +106,53 @@ class PairingService:
         pools = self._apply_recent_suppression(pools)
         
         # Select pair using algorithm
-        left_sha256, right_sha256 = self._select_pair(pools, current_round)
+        left_image, right_image = self._select_pair(pools, current_round)
         
-        if not left_sha256 or not right_sha256:
+        if not left_image or not right_image:
             return None, None, current_round
         
-        # Build image data
-        left_data = self._build_image_data(left_sha256, directory_service)
-        right_data = self._build_image_data(right_sha256, directory_service)
+        # Build image data from the pool rows already loaded
+        left_data = self._build_image_data(left_image, directory_service)
+        right_data = self._build_image_data(right_image, directory_service)
         
         # Update recent suppression rings
-        self.recent_images.append(left_sha256)
-        self.recent_images.append(right_sha256)
+        self.recent_images.append(left_image.sha256)
+        self.recent_images.append(right_image.sha256)
         
         # Create canonical pair representation for recent pairs
-        pair_key = tuple(sorted([left_sha256, right_sha256]))
+        pair_key = _canon(left_image.sha256, right_image.sha256)
         self.recent_pairs.append(pair_key)
         
         return left_data, right_data, current_round
     
     def _bump_round(self) -> int:
         """Atomically increment and return new round number."""
-        # Lock app_state row and increment
-        stmt = select(AppState).where(AppState.id == 1).with_for_update()
-        app_state = self.db.execute(stmt).scalar_one_or_none()
+        # Increment in place and read the new value back in the same statement
+        stmt = update(AppState).where(AppState.id == 1).values(
+            round=AppState.round + 1
+        ).returning(AppState.round).execution_options(synchronize_session=False)
+        current_round = self.db.execute(stmt).scalar_one_or_none()
         
-        if not app_state:
+        if current_round is None:
             # Initialize if missing (should not happen with migration)
-            app_state = AppState(id=1, round=1)
-            self.db.add(app_state)
-        else:
-            app_state.round += 1
+            current_round = 1
+            self.db.add(AppState(id=1, round=current_round))
         
         self.db.commit()
-        return app_state.round
+        return current_round
     
-    def _load_eligible_pools(self, current_round: int, available_sha256s: Set[str]) -> Dict[str, List[Image]]:
+    def _load_eligible_pools(self, current_round: int, available_sha256s: Set[str]) -> Dict[str, List[PoolImage]]:
         """Load image pools: UNSEEN, ACTIVE, SKIPPED_ELIGIBLE, SKIPPED_COOLDOWN."""
-        # Get all images for available SHA256s
-        stmt = select(Image).where(Image.sha256.in_(available_sha256s))
-        all_images = {img.sha256: img for img in self.db.execute(stmt).scalars().all()}
+        # Classify images into pools in SQL; archived images are tagged so they can be skipped
+        pool = case(
+            (Image.is_archived_hard_no == True, 'ARCHIVED'),
+            (Image.exposures == 0, 'UNSEEN'),
+            (Image.next_eligible_round.is_(None), 'ACTIVE'),
+            (Image.next_eligible_round <= current_round, 'SKIPPED_ELIGIBLE'),
+            else_='SKIPPED_COOLDOWN'
+        ).label('pool')
+        stmt = select(*POOL_COLUMNS, pool).where(Image.sha256.in_(available_sha256s))
         
-        # Initialize pools
         pools = {
             "UNSEEN": [],
             "ACTIVE": [],
@@ -97,46 +160,39 @@ class PairingService:
             "SKIPPED_COOLDOWN": []
         }
         
-        # Classify images into pools
-        for sha256 in available_sha256s:
-            image = all_images.get(sha256)
-            if not image:
-                # New image not yet in DB - treat as UNSEEN
-                pools["UNSEEN"].append(self._create_unseen_image(sha256))
-                continue
-            
-            # Skip archived images
-            if image.is_archived_hard_no:
-                continue
-            
-            # Classify based on state
-            if image.exposures == 0:
-                pools["UNSEEN"].append(image)
-            elif image.next_eligible_round is not None:
-                if current_round >= image.next_eligible_round:
-                    pools["SKIPPED_ELIGIBLE"].append(image)
-                else:
-                    pools["SKIPPED_COOLDOWN"].append(image)
-            else:
-                pools["ACTIVE"].append(image)
+        loaded_sha256s = set()
+        for row in self.db.execute(stmt):
+            loaded_sha256s.add(row.sha256)
+            if row.pool in pools:
+                pools[row.pool].append(PoolImage._make(row[:-1]))
+        
+        # New images not yet in DB - treat as UNSEEN
+        for sha256 in available_sha256s - loaded_sha256s:
+            pools["UNSEEN"].append(self._create_unseen_image(sha256))
         
         return pools
     
-    def _create_unseen_image(self, sha256: str) -> Image:
-        """Create a temporary Image object for unseen image."""
-        return Image(
+    def _create_unseen_image(self, sha256: str) -> PoolImage:
+        """Create a placeholder pool entry for an unseen image."""
+        return PoolImage(
             sha256=sha256,
             mu=settings.initial_mu,
             sigma=settings.initial_sigma,
             exposures=0,
             likes=0,
             unlikes=0,
-            skips=0
+            skips=0,
+            next_eligible_round=None,
+            is_archived_hard_no=False
         )
     
-    def _apply_recent_suppression(self, pools: Dict[str, List[Image]]) -> Dict[str, List[Image]]:
+    def _apply_recent_suppression(self, pools: Dict[str, List[PoolImage]]) -> Dict[str, List[PoolImage]]:
         """Remove recently seen images from pools if avoidable."""
-        recent_sha256s = set(self.recent_images)
+        if not self.recent_images:
+            # Nothing to suppress; skip rebuilding every pool
+            return pools
+        
+        recent_sha256s = self.recent_images.members
         
         filtered_pools = {}
         for pool_name, images in pools.items():
@@ -151,58 +207,65 @@ class PairingService:
         
         return filtered_pools
     
-    def _select_pair(self, pools: Dict[str, List[Image]], current_round: int) -> Tuple[Optional[str], Optional[str]]:
+    def _select_pair(self, pools: Dict[str, List[PoolImage]], current_round: int) -> Tuple[Optional[PoolImage], Optional[PoolImage]]:
         """Select image pair using algo-update.yaml strategy."""
         
         # Check epsilon-greedy random selection (10%)
-        if random.random() < settings.epsilon_greedy:
+        if self.rng.random() < settings.epsilon_greedy:
             return self._select_random_pair(pools)
         
         # Strategy 1: If UNSEEN exists, pair with ACTIVE
         if pools["UNSEEN"]:
-            unseen_img = random.choice(pools["UNSEEN"])
+            unseen_img = self._choice(pools["UNSEEN"])
             active_img = self._pick_active_near_median_high_sigma(pools["ACTIVE"])
             if active_img:
-                return unseen_img.sha256, active_img.sha256
+                return unseen_img, active_img
             # Fallback: pair two unseen if no active available
             if len(pools["UNSEEN"]) >= 2:
-                pair = random.sample(pools["UNSEEN"], 2)
-                return pair[0].sha256, pair[1].sha256
+                return self._sample_pair(pools["UNSEEN"])
         
         # Strategy 2: Select from ACTIVE with information gain
         if len(pools["ACTIVE"]) >= 2:
-            left_sha256, right_sha256 = self._select_by_information_gain(pools["ACTIVE"])
+            left_img, right_img = self._select_by_information_gain(pools["ACTIVE"])
         else:
-            left_sha256, right_sha256 = None, None
+            left_img, right_img = None, None
         
         # Strategy 3: Maybe inject eligible skipped image (30% probability)
-        if (pools["SKIPPED_ELIGIBLE"] and random.random() < settings.skip_inject_probability and
-            left_sha256 and right_sha256):
+        if (pools["SKIPPED_ELIGIBLE"] and self.rng.random() < settings.skip_inject_probability and
+            left_img and right_img):
             
             # Replace one of the selected images with a skipped one
-            skipped_img = random.choice(pools["SKIPPED_ELIGIBLE"])
-            if random.random() < 0.5:
-                left_sha256 = skipped_img.sha256
+            skipped_img = self._choice(pools["SKIPPED_ELIGIBLE"])
+            if self.rng.random() < 0.5:
+                left_img = skipped_img
             else:
-                right_sha256 = skipped_img.sha256
+                right_img = skipped_img
         
         # Ensure no self-pairing and no recent repeats
-        if left_sha256 and right_sha256 and left_sha256 != right_sha256:
-            pair_key = tuple(sorted([left_sha256, right_sha256]))
+        if left_img and right_img and left_img.sha256 != right_img.sha256:
+            pair_key = _canon(left_img.sha256, right_img.sha256)
             if pair_key not in self.recent_pairs:
-                return left_sha256, right_sha256
+                return left_img, right_img
         
         return None, None
     
-    def _select_random_pair(self, pools: Dict[str, List[Image]]) -> Tuple[Optional[str], Optional[str]]:
+    def _select_random_pair(self, pools: Dict[str, List[PoolImage]]) -> Tuple[Optional[PoolImage], Optional[PoolImage]]:
         """Select completely random pair for epsilon-greedy exploration."""
         all_images = pools["UNSEEN"] + pools["ACTIVE"] + pools["SKIPPED_ELIGIBLE"]
         if len(all_images) >= 2:
-            pair = random.sample(all_images, 2)
-            return pair[0].sha256, pair[1].sha256
+            return self._sample_pair(all_images)
         return None, None
     
-    def _pick_active_near_median_high_sigma(self, active_images: List[Image]) -> Optional[Image]:
+    def _choice(self, images: List[PoolImage]) -> PoolImage:
+        """Pick one image uniformly at random."""
+        return images[self.rng.integers(len(images))]
+    
+    def _sample_pair(self, images: List[PoolImage]) -> Tuple[PoolImage, PoolImage]:
+        """Pick two distinct images uniformly at random."""
+        i, j = self.rng.choice(len(images), size=2, replace=False)
+        return images[i], images[j]
+    
+    def _pick_active_near_median_high_sigma(self, active_images: List[PoolImage]) -> Optional[PoolImage]:
         """Pick ACTIVE image near median mu with high sigma."""
         if not active_images:
             return None
@@ -210,20 +273,18 @@ class PairingService:
         if len(active_images) == 1:
             return active_images[0]
         
-        # Calculate median mu
-        mu_values = [img.mu for img in active_images]
-        median_mu = statistics.median(mu_values)
+        size = len(active_images)
+        mu = np.fromiter((img.mu for img in active_images), dtype=np.float64, count=size)
+        sigma = np.fromiter((img.sigma for img in active_images), dtype=np.float64, count=size)
         
-        # Score by closeness to median (lower is better) and high sigma (higher is better)
-        def score_fn(img):
-            mu_distance = abs(img.mu - median_mu)
-            return img.sigma - mu_distance / 10.0  # Balance sigma vs mu distance
+        # Score by closeness to median (lower is better) and high sigma (higher is better),
+        # balancing sigma vs mu distance
+        scores = sigma - np.abs(mu - np.median(mu)) / 10.0
         
-        # Select best scoring image
-        best_img = max(active_images, key=score_fn)
-        return best_img
+        # Select best scoring image (argmax keeps the first on ties, like max())
+        return active_images[int(np.argmax(scores))]
     
-    def _select_by_information_gain(self, active_images: List[Image]) -> Tuple[Optional[str], Optional[str]]:
+    def _select_by_information_gain(self, active_images: List[PoolImage]) -> Tuple[Optional[PoolImage], Optional[PoolImage]]:
         """Select pair from ACTIVE images maximizing information gain."""
         if len(active_images) < 2:
             return None, None
@@ -232,50 +293,34 @@ class PairingService:
         k = min(settings.shortlist_k, len(active_images))
         
         if len(active_images) > k:
-            mu_values = [img.mu for img in active_images]
-            median_mu = statistics.median(mu_values)
+            median_mu = float(np.median(
+                np.fromiter((img.mu for img in active_images), dtype=np.float64, count=len(active_images))
+            ))
             
             # Sort by sigma DESC, then closeness to median
             def shortlist_key(img):
                 mu_distance = abs(img.mu - median_mu)
                 return (-img.sigma, mu_distance)  # Negative sigma for DESC
             
-            shortlist = sorted(active_images, key=shortlist_key)[:k]
+            # nsmallest is O(N log k) and returns the same k, in the same order, as sorted()[:k]
+            shortlist = heapq.nsmallest(k, active_images, key=shortlist_key)
         else:
             shortlist = active_images
         
-        # Find pair with maximum information gain
-        best_pair = None
-        best_gain = -1
-        
-        for i in range(len(shortlist)):
-            for j in range(i + 1, len(shortlist)):
-                img_a, img_b = shortlist[i], shortlist[j]
-                gain = calculate_information_gain(img_a.mu, img_a.sigma, img_b.mu, img_b.sigma)
-                
-                if gain > best_gain:
-                    best_gain = gain
-                    best_pair = (img_a.sha256, img_b.sha256)
+        # Find pair with maximum information gain over the whole shortlist at once
+        size = len(shortlist)
+        mu = np.fromiter((img.mu for img in shortlist), dtype=np.float64, count=size)
+        sigma = np.fromiter((img.sigma for img in shortlist), dtype=np.float64, count=size)
+        gains = calculate_information_gain_matrix(mu, sigma)
         
-        return best_pair if best_pair else (None, None)
+        # Only pairs i < j count; argmax then keeps the first best pair in (i, j) order
+        gains[np.tril_indices(size)] = -np.inf
+        i, j = np.unravel_index(np.argmax(gains), gains.shape)
+        return shortlist[i], shortlist[j]
     
-    def _build_image_data(self, sha256: str, directory_service) -> Dict:
-        """Build complete image data for API response."""
-        # Get image stats from DB
-        stmt = select(Image).where(Image.sha256 == sha256)
-        image = self.db.execute(stmt).scalar_one_or_none()
-        
-        if not image:
-            # Create default for new images
-            image = Image(
-                sha256=sha256,
-                mu=settings.initial_mu,
-                sigma=settings.initial_sigma,
-                exposures=0,
-                likes=0,
-                unlikes=0,
-                skips=0
-            )
+    def _build_image_data(self, image: PoolImage, directory_service) -> Dict:
+        """Build complete image data for API response from its pool row (no DB access)."""
+        sha256 = image.sha256
         
         # Get file path from directory service
         file_path = directory_service.get_path_by_sha256(sha256)
@@ -307,9 +352,8 @@ class PairingService:
         Returns:
             Dict with success status
         """
-        # Get or create image records
-        left_image = self._get_or_create_image(left_sha256)
-        right_image = self._get_or_create_image(right_sha256)
+        # Get or create both images' ratings in one query
+        ratings = self._get_or_create_ratings([left_sha256, right_sha256])
         
         # Record the choice
         if outcome == "SKIP":
@@ -336,89 +380,86 @@ class PairingService:
         
         # Update ratings and statistics
         if outcome == "SKIP":
-            self._handle_skip(left_image, right_image)
+            self._handle_skip(left_sha256, right_sha256, round_num)
         else:
-            self._handle_choice(left_image, right_image, outcome)
+            self._handle_choice(left_sha256, right_sha256, ratings, outcome, round_num)
         
         self.db.commit()
         return {"ok": True}
     
-    def _get_or_create_image(self, sha256: str) -> Image:
-        """Get existing image or create new one with defaults."""
-        stmt = select(Image).where(Image.sha256 == sha256)
-        image = self.db.execute(stmt).scalar_one_or_none()
-        
-        if not image:
-            # Create new image with default Elo+σ values
-            image = Image(
-                sha256=sha256,
-                mu=settings.initial_mu,
-                sigma=settings.initial_sigma,
-                exposures=0,
-                likes=0,
-                unlikes=0,
-                skips=0,
-                is_archived_hard_no=False
-            )
-            self.db.add(image)
-        
-        return image
+    def _get_or_create_ratings(self, sha256s: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Get (mu, sigma) keyed by sha256, inserting default rows for unknown images."""
+        stmt = select(Image.sha256, Image.mu, Image.sigma).where(Image.sha256.in_(sha256s))
+        ratings = {row.sha256: (row.mu, row.sigma) for row in self.db.execute(stmt)}
+        
+        # Create new images with default Elo+σ values
+        missing = [sha256 for sha256 in dict.fromkeys(sha256s) if sha256 not in ratings]
+        if missing:
+            self.db.execute(insert(Image.__table__), [
+                {
+                    'sha256': sha256,
+                    'mu': settings.initial_mu,
+                    'sigma': settings.initial_sigma,
+                    'exposures': 0,
+                    'likes': 0,
+                    'unlikes': 0,
+                    'skips': 0,
+                    'is_archived_hard_no': False
+                }
+                for sha256 in missing
+            ])
+            ratings.update((sha256, (settings.initial_mu, settings.initial_sigma)) for sha256 in missing)
+        
+        return ratings
     
-    def _handle_choice(self, left_image: Image, right_image: Image, outcome: str):
-        """Handle LEFT/RIGHT choice with Elo+σ updates."""
+    def _handle_choice(self, left_sha256: str, right_sha256: str,
+                       ratings: Dict[str, Tuple[float, float]], outcome: str, round_num: int):
+        """Handle LEFT/RIGHT choice with Elo+σ updates (one executemany UPDATE for both images)."""
+        left_mu, left_sigma = ratings[left_sha256]
+        right_mu, right_sigma = ratings[right_sha256]
+        
         # Update Elo+σ ratings
         new_mu_left, new_sigma_left, new_mu_right, new_sigma_right = \
-            self.elo_calc.update_ratings(
-                left_image.mu, left_image.sigma,
-                right_image.mu, right_image.sigma,
-                outcome
+            self.elo_calc.update_ratings(left_mu, left_sigma, right_mu, right_sigma, outcome)
+        
+        # Exposures go up for both images (both were shown); the winner gets a like,
+        # the loser an unlike. Skip cooldowns are cleared (images were chosen, not
+        # skipped) and last seen is the round the pair was served in.
+        images = Image.__table__
+        stmt = (
+            update(images)
+            .where(images.c.sha256 == bindparam('b_sha256'))
+            .values(
+                mu=bindparam('b_mu'),
+                sigma=bindparam('b_sigma'),
+                exposures=images.c.exposures + 1,
+                likes=images.c.likes + bindparam('b_likes'),
+                unlikes=images.c.unlikes + bindparam('b_unlikes'),
+                next_eligible_round=None,
+                last_seen_round=round_num
             )
-        
-        # Apply rating updates
-        left_image.mu = new_mu_left
-        left_image.sigma = new_sigma_left
-        right_image.mu = new_mu_right
-        right_image.sigma = new_sigma_right
-        
-        # Update exposure counts (both images were shown)
-        left_image.exposures += 1
-        right_image.exposures += 1
-        
-        # Update like/unlike counts
-        if outcome == "LEFT":
-            left_image.likes += 1
-            right_image.unlikes += 1
-        else:  # outcome == "RIGHT"
-            right_image.likes += 1
-            left_image.unlikes += 1
-        
-        # Clear skip cooldowns (images were chosen, not skipped)
-        left_image.next_eligible_round = None
-        right_image.next_eligible_round = None
-        
-        # Update last seen round
-        current_round = self._get_current_round()
-        left_image.last_seen_round = current_round
-        right_image.last_seen_round = current_round
+        )
+        left_won = outcome == "LEFT"
+        self.db.execute(stmt, [
+            {'b_sha256': left_sha256, 'b_mu': new_mu_left, 'b_sigma': new_sigma_left,
+             'b_likes': int(left_won), 'b_unlikes': int(not left_won)},
+            {'b_sha256': right_sha256, 'b_mu': new_mu_right, 'b_sigma': new_sigma_right,
+             'b_likes': int(not left_won), 'b_unlikes': int(left_won)},
+        ])
     
-    def _handle_skip(self, left_image: Image, right_image: Image):
+    def _handle_skip(self, left_sha256: str, right_sha256: str, round_num: int):
         """Handle SKIP outcome with cooldown periods."""
         from ..utils.elo_utils import generate_skip_cooldown
         
-        # Update skip counts
-        left_image.skips += 1
-        right_image.skips += 1
-        
-        # Set skip cooldown periods
-        current_round = self._get_current_round()
-        left_image.next_eligible_round = current_round + generate_skip_cooldown()
-        right_image.next_eligible_round = current_round + generate_skip_cooldown()
-        
-        # No mu/sigma updates for skips
-        # No exposure increments for skips
-    
-    def _get_current_round(self) -> int:
-        """Get current round without incrementing."""
-        stmt = select(AppState.round).where(AppState.id == 1)
-        result = self.db.execute(stmt).scalar_one_or_none()
-        return result if result is not None else 0
\ No newline at end of file
+        # Update skip counts and set skip cooldown periods from the round the pair was served in.
+        # No mu/sigma updates for skips; no exposure increments for skips
+        images = Image.__table__
+        stmt = (
+            update(images)
+            .where(images.c.sha256 == bindparam('b_sha256'))
+            .values(skips=images.c.skips + 1, next_eligible_round=bindparam('b_next_eligible_round'))
+        )
+        self.db.execute(stmt, [
+            {'b_sha256': left_sha256, 'b_next_eligible_round': round_num + generate_skip_cooldown()},
+            {'b_sha256': right_sha256, 'b_next_eligible_round': round_num + generate_skip_cooldown()},
+        ])
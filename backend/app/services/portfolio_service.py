@@ -1,17 +1,97 @@
+import errno
+import logging
 import os
-import shutil
+import stat
 import zipfile
 from io import BytesIO
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from ..models.portfolio import Portfolio
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import literal, select
+from ..models.portfolio import Portfolio, portfolio_images
 from ..models.image import Image
 from ..models.user import User
 from .choice_service import ChoiceService
 from .directory_service import DirectoryService
 
+logger = logging.getLogger(__name__)
+
+# Bytes requested per copy_file_range call, and the buffer for the read/write fallback
+COPY_RANGE_SIZE = 1 << 30
+COPY_BUFFER_SIZE = 1 << 20
+
+# Upper bound on concurrent file copies during a directory export
+EXPORT_COPY_WORKERS = 16
+
+
+def _fast_copy(source_path: str, dest_path: str):
+    """
+    Copy a file with its mode and timestamps, like shutil.copy2.
+    
+    Tries os.copy_file_range first, so the kernel does the copy (a reflink on
+    CoW filesystems, server-side on NFS). Falls back to a 1 MiB read/write
+    loop, from the start, where it is unsupported or copies fewer bytes than
+    the source holds.
+    """
+    src_fd = os.open(source_path, os.O_RDONLY)
+    try:
+        src_stat = os.fstat(src_fd)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        dst_fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            copied = 0
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    while size := os.copy_file_range(src_fd, dst_fd, COPY_RANGE_SIZE):
+                        copied += size
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                        raise
+            
+            # Some filesystems (procfs, FUSE/overlay, some cross-device kernels) report 0
+            # or stop short instead of failing; copy those with the read/write loop
+            if copied < src_stat.st_size:
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+                
+                # Reserve the destination's extents up front so the write loop doesn't grow
+                # it block by block (copy_file_range is left to lay out or share extents itself)
+                if hasattr(os, 'posix_fallocate') and src_stat.st_size:
+                    try:
+                        os.posix_fallocate(dst_fd, 0, src_stat.st_size)
+                    except OSError:
+                        pass
+                
+                buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+                while size := os.readv(src_fd, [buffer]):
+                    written = 0
+                    while written < size:
+                        written += os.write(dst_fd, buffer[written:size])
+            
+            os.fchmod(dst_fd, stat.S_IMODE(src_stat.st_mode))
+            os.utime(dst_fd, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def _export_image_file(copy: Tuple[str, str, str]) -> bool:
+    """Copy one (sha256, source_path, dest_path) export, logging instead of raising."""
+    sha256, source_path, dest_path = copy
+    try:
+        _fast_copy(source_path, dest_path)
+        return True
+    except FileNotFoundError:
+        logger.warning("Could not find file for image %s", sha256)
+    except Exception as e:
+        # Log error but continue with other images
+        logger.warning("Failed to export image %s: %s", sha256, e)
+    return False
+
 
 class PortfolioService:
     """Service for portfolio management and export."""
@@ -31,39 +111,67 @@ class PortfolioService:
             if not isinstance(image_id, str) or len(image_id) != 64:
                 raise ValueError(f"Invalid image ID format (expected SHA256): {image_id}")
         
-        # Check that all images exist (by SHA256)
-        stmt = select(Image).where(Image.sha256.in_(image_ids))
-        existing_images = list(self.db.execute(stmt).scalars().all())
+        # Check that all images exist (by SHA256); repeated IDs only count once
+        stmt = select(Image.sha256).where(Image.sha256.in_(image_ids))
+        found_sha256s = set(self.db.execute(stmt).scalars().all())
         
-        if len(existing_images) != len(image_ids):
-            found_sha256s = {img.sha256 for img in existing_images}
-            missing = set(image_ids) - found_sha256s
+        missing = set(image_ids) - found_sha256s
+        if missing:
             raise ValueError(f"Some images were not found: {missing}")
         
         # Create portfolio
         portfolio = Portfolio(
             name=name,
             description=description,
-            user_id=UUID(user_id),
-            images=existing_images
+            user_id=UUID(user_id)
         )
         
         self.db.add(portfolio)
+        self.db.flush()  # Get ID
+        
+        # Link images with one INSERT ... SELECT instead of an ORM insert per association row
+        if image_ids:
+            self.db.execute(portfolio_images.insert().from_select(
+                ['portfolio_id', 'image_sha256'],
+                select(literal(portfolio.id, portfolio_images.c.portfolio_id.type), Image.sha256)
+                .where(Image.sha256.in_(found_sha256s))
+            ))
+        
         self.db.commit()
         self.db.refresh(portfolio)
         
         return portfolio
     
     def get_portfolio(self, portfolio_id: str) -> Optional[Portfolio]:
-        """Get a portfolio by ID."""
+        """Get a portfolio by ID (served from the session's identity map when already loaded)."""
+        try:
+            portfolio_uuid = UUID(portfolio_id)
+        except ValueError:
+            return None
+        
+        return self.db.get(Portfolio, portfolio_uuid)
+    
+    def get_portfolio_with_images(self, portfolio_id: str) -> Optional[Portfolio]:
+        """Get a portfolio by ID with its images loaded in the same lookup."""
         try:
             portfolio_uuid = UUID(portfolio_id)
         except ValueError:
             return None
         
-        stmt = select(Portfolio).where(Portfolio.id == portfolio_uuid)
+        stmt = (
+            select(Portfolio)
+            .options(selectinload(Portfolio.images))
+            .where(Portfolio.id == portfolio_uuid)
+        )
         return self.db.execute(stmt).scalar_one_or_none()
     
+    def _get_image_sha256s(self, portfolio_id: UUID) -> List[str]:
+        """Get the SHA256s of a portfolio's images straight from the link table."""
+        stmt = select(portfolio_images.c.image_sha256).where(
+            portfolio_images.c.portfolio_id == portfolio_id
+        )
+        return list(self.db.execute(stmt).scalars().all())
+    
     def export_portfolio_to_zip(self, portfolio_id: str) -> tuple[BytesIO, str, int]:
         """Export portfolio images as a zip file in memory."""
         
@@ -85,28 +193,34 @@ class PortfolioService:
         exported_count = 0
         
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            # Resolve every source file path in one query
+            sha256s = self._get_image_sha256s(portfolio.id)
+            source_paths = directory_service.get_paths_by_sha256(sha256s)
+            
             # Add each image to the zip
-            for image in portfolio.images:
+            for sha256 in sha256s:
                 try:
-                    # Find source file path using SHA256
-                    source_path = directory_service.get_path_by_sha256(image.sha256)
+                    source_path = source_paths.get(sha256)
                     
-                    if source_path and os.path.exists(source_path):
+                    # Paths were just resolved on disk; a file that vanished since makes write() raise
+                    if source_path:
                         # Get file extension
                         _, ext = os.path.splitext(source_path)
                         
                         # Create filename (SHA256 + original extension)
-                        filename = f"{image.sha256}{ext}"
+                        filename = f"{sha256}{ext}"
                         
                         # Add file to zip
                         zip_file.write(source_path, filename)
                         exported_count += 1
                     else:
-                        print(f"Warning: Could not find file for image {image.sha256}")
+                        logger.warning("Could not find file for image %s", sha256)
                     
+                except FileNotFoundError:
+                    logger.warning("Could not find file for image %s", sha256)
                 except Exception as e:
                     # Log error but continue with other images
-                    print(f"Failed to export image {image.sha256}: {str(e)}")
+                    logger.warning("Failed to export image %s: %s", sha256, e)
                     continue
         
         zip_buffer.seek(0)
@@ -130,32 +244,27 @@ class PortfolioService:
         
         # Directory service is ready - uses /app/uploads
         
-        exported_count = 0
+        # Resolve source files in one query on this thread; the session must not be
+        # shared with the workers
+        sha256s = self._get_image_sha256s(portfolio.id)
+        source_paths = directory_service.get_paths_by_sha256(sha256s)
         
-        # Export each image by copying from filesystem
-        for image in portfolio.images:
-            try:
-                # Find source file path using SHA256
-                source_path = directory_service.get_path_by_sha256(image.sha256)
-                
-                if source_path and os.path.exists(source_path):
-                    # Get file extension
-                    _, ext = os.path.splitext(source_path)
-                    
-                    # Create destination filename (SHA256 + original extension)
-                    dest_filename = f"{image.sha256}{ext}"
-                    dest_path = os.path.join(full_export_path, dest_filename)
-                    
-                    # Copy file
-                    shutil.copy2(source_path, dest_path)
-                    exported_count += 1
-                else:
-                    print(f"Warning: Could not find file for image {image.sha256}")
-                
-            except Exception as e:
-                # Log error but continue with other images
-                print(f"Failed to export image {image.sha256}: {str(e)}")
-                continue
+        copies = []
+        for sha256 in sha256s:
+            source_path = source_paths.get(sha256)
+            if source_path:
+                # Create destination filename (SHA256 + original extension)
+                _, ext = os.path.splitext(source_path)
+                dest_path = os.path.join(full_export_path, f"{sha256}{ext}")
+                copies.append((sha256, source_path, dest_path))
+            else:
+                logger.warning("Could not find file for image %s", sha256)
+        
+        # Copies are I/O-bound and release the GIL, so run them on a thread pool
+        exported_count = 0
+        if copies:
+            with ThreadPoolExecutor(max_workers=min(EXPORT_COPY_WORKERS, len(copies))) as executor:
+                exported_count = sum(executor.map(_export_image_file, copies))
         
         return {
             "exported_count": exported_count,
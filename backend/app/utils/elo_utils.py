@@ -4,6 +4,10 @@ Elo+σ rating calculation utilities as per algo-update.yaml specification.
 import math
 import random
 from typing import Tuple
+import numpy as np
+
+# 10^(d/400) == e^(d * ln(10)/400); exp is cheaper than a general pow
+LN10_OVER_400 = math.log(10) / 400.0
 
 
 class EloCalculator:
@@ -17,21 +21,32 @@ class EloCalculator:
         self.k_min = 8
         self.k_max = 48
         self.sigma_decay = 0.97
+        
+        # k_factor with the constants above folded in (rebuild if they change)
+        self.k_factor = self._specialize_k_factor()
     
     def expected_score(self, mu_a: float, mu_b: float) -> float:
         """
         Calculate expected score using Elo formula.
         E(a) = 1 / (1 + 10^((mu_b - mu_a)/400))
         """
-        return 1.0 / (1.0 + math.pow(10, (mu_b - mu_a) / 400.0))
+        return 1.0 / (1.0 + math.exp((mu_b - mu_a) * LN10_OVER_400))
     
-    def k_factor(self, sigma: float) -> float:
-        """
-        Calculate dynamic K-factor based on uncertainty.
-        K_i = clamp(k_base * (sigma_i / sigma0), k_min, k_max)
-        """
-        k = self.k_base * (sigma / self.sigma0)
-        return max(self.k_min, min(self.k_max, k))
+    def _specialize_k_factor(self):
+        """Build k_factor with the K constants bound as closure locals."""
+        scale = self.k_base / self.sigma0
+        k_min = self.k_min
+        k_max = self.k_max
+        
+        def k_factor(sigma: float) -> float:
+            """
+            Calculate dynamic K-factor based on uncertainty.
+            K_i = clamp(k_base * (sigma_i / sigma0), k_min, k_max)
+            """
+            k = sigma * scale
+            return k_max if k > k_max else (k_min if k < k_min else k)
+        
+        return k_factor
     
     def update_ratings(self, mu_a: float, sigma_a: float, mu_b: float, sigma_b: float, 
                       outcome: str) -> Tuple[float, float, float, float]:
@@ -80,6 +95,52 @@ class EloCalculator:
         
         return new_mu_a, new_sigma_a, new_mu_b, new_sigma_b
     
+    def update_ratings_batch(self, mu_a: np.ndarray, sigma_a: np.ndarray, mu_b: np.ndarray, sigma_b: np.ndarray,
+                             outcome: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized update_ratings over arrays of independent pairs.
+        
+        Every pair is rated from the input arrays, so an image that appears in
+        several pairs is not updated cumulatively; replay those in order.
+        
+        Args:
+            mu_a, sigma_a: Ratings and uncertainties for left images
+            mu_b, sigma_b: Ratings and uncertainties for right images
+            outcome: Array of "LEFT", "RIGHT", or "SKIP"
+            
+        Returns:
+            Tuple of arrays (new_mu_a, new_sigma_a, new_mu_b, new_sigma_b)
+        """
+        mu_a = np.asarray(mu_a, dtype=np.float64)
+        sigma_a = np.asarray(sigma_a, dtype=np.float64)
+        mu_b = np.asarray(mu_b, dtype=np.float64)
+        sigma_b = np.asarray(sigma_b, dtype=np.float64)
+        outcome = np.asarray(outcome)
+        
+        left = outcome == "LEFT"
+        right = outcome == "RIGHT"
+        skip = outcome == "SKIP"
+        if not np.all(left | right | skip):
+            raise ValueError(f"Invalid outcome: {outcome[~(left | right | skip)][0]}")
+        
+        # Expected and actual scores
+        E_a = 1.0 / (1.0 + np.exp((mu_b - mu_a) * LN10_OVER_400))
+        E_b = 1.0 - E_a
+        S_a = left.astype(np.float64)
+        S_b = right.astype(np.float64)
+        
+        # K-factors
+        K_a = np.clip(self.k_base * (sigma_a / self.sigma0), self.k_min, self.k_max)
+        K_b = np.clip(self.k_base * (sigma_b / self.sigma0), self.k_min, self.k_max)
+        
+        # Skipped pairs keep their mu and sigma
+        new_mu_a = np.where(skip, mu_a, mu_a + K_a * (S_a - E_a))
+        new_mu_b = np.where(skip, mu_b, mu_b + K_b * (S_b - E_b))
+        new_sigma_a = np.where(skip, sigma_a, np.maximum(self.sigma_min, sigma_a * self.sigma_decay))
+        new_sigma_b = np.where(skip, sigma_b, np.maximum(self.sigma_min, sigma_b * self.sigma_decay))
+        
+        return new_mu_a, new_sigma_a, new_mu_b, new_sigma_b
+    
     def confidence_interval(self, mu: float, sigma: float, z: float = 1.0) -> Tuple[float, float]:
         """
         Calculate confidence interval bounds.
@@ -107,5 +168,21 @@ def calculate_information_gain(mu_a: float, sigma_a: float, mu_b: float, sigma_b
     mu_diff = abs(mu_a - mu_b)
     closeness_factor = 1.0 / (1.0 + mu_diff / 100.0)  # Scale factor
     
+    # Combined information gain
+    return uncertainty_factor * closeness_factor
+
+
+def calculate_information_gain_matrix(mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    """
+    Vectorized calculate_information_gain over every pair of images.
+    Entry [i, j] is the gain from comparing image i with image j.
+    """
+    # Uncertainty factor (higher sigma = more info)
+    uncertainty_factor = (sigma[:, None] + sigma[None, :]) / 2.0
+    
+    # Closeness factor (closer mu = more discriminative)
+    mu_diff = np.abs(mu[:, None] - mu[None, :])
+    closeness_factor = 1.0 / (1.0 + mu_diff / 100.0)  # Scale factor
+    
     # Combined information gain
     return uncertainty_factor * closeness_factor
\ No newline at end of file
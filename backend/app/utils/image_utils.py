@@ -1,7 +1,9 @@
 import hashlib
 import base64
 import os
-from typing import Tuple, Optional
+import threading
+from functools import lru_cache
+from typing import NamedTuple, Tuple, Optional
 from PIL import Image
 import magic
 
@@ -13,14 +15,47 @@ except ImportError:
     # pillow-heif not installed, HEIC support disabled
     pass
 
+# Read buffer for the pre-3.11 hashing loop (hashlib.file_digest sizes its own)
+HASH_BUFFER_SIZE = 256 * 1024
+
+# Bytes read per base64 chunk (a multiple of 3)
+BASE64_CHUNK_SIZE = 768 * 1024
+
+# (path, size, mtime_ns) -> MIME type results kept by get_mime_type
+MIME_CACHE_SIZE = 65536
+
+# Leading bytes of common image formats; files that start with one skip libmagic
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+
+# libmagic handles are not thread-safe, so each thread loads its own (once)
+_magic_local = threading.local()
+
 
 def get_sha256_hash(file_path: str) -> str:
     """Generate SHA-256 hash from file content."""
+    return get_sha256_digest(file_path).hex()
+
+
+def get_sha256_digest(file_path: str) -> bytes:
+    """Generate the raw 32-byte SHA-256 digest of file content."""
     sha256 = hashlib.sha256()
     with open(file_path, 'rb') as f:
-        while chunk := f.read(8192):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+        fd = f.fileno()
+        # Read rather than mmap at every size: a file truncated mid-hash would SIGBUS the worker
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if hasattr(hashlib, 'file_digest'):
+            # Python 3.11+: the read/update loop runs in C
+            sha256 = hashlib.file_digest(f, 'sha256')
+        else:
+            buffer = memoryview(bytearray(HASH_BUFFER_SIZE))
+            while size := f.readinto(buffer):
+                sha256.update(buffer[:size])
+        
+        # The bytes are not needed again; let the kernel drop them from the page cache
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return sha256.digest()
 
 
 def get_image_dimensions(file_path: str) -> Tuple[int, int]:
@@ -32,41 +67,108 @@ def get_image_dimensions(file_path: str) -> Tuple[int, int]:
         return (0, 0)
 
 
+def _get_magic() -> magic.Magic:
+    """Get this thread's MIME-mode Magic instance, loading the database on first use."""
+    mime = getattr(_magic_local, 'mime', None)
+    if mime is None:
+        mime = _magic_local.mime = magic.Magic(mime=True)
+    return mime
+
+
+@lru_cache(maxsize=MIME_CACHE_SIZE)
+def _detect_mime_type(file_path: str, size: int, mtime_ns: int) -> str:
+    """Run libmagic on a file; size and mtime_ns key the cache to this version of it."""
+    return _get_magic().from_file(file_path)
+
+
 def get_mime_type(file_path: str) -> str:
     """Get MIME type using python-magic."""
     try:
-        mime = magic.Magic(mime=True)
-        return mime.from_file(file_path)
+        stat = os.stat(file_path)
+        return _detect_mime_type(file_path, stat.st_size, stat.st_mtime_ns)
     except Exception:
-        # Fallback to extension-based detection
-        ext = os.path.splitext(file_path)[1].lower()
-        mime_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg', 
-            '.png': 'image/png',
-            '.webp': 'image/webp',
-            '.heic': 'image/heic'
-        }
-        return mime_map.get(ext, 'application/octet-stream')
+        return _mime_type_from_extension(file_path)
+
+
+def _mime_type_from_extension(file_path: str) -> str:
+    """Fallback to extension-based detection."""
+    ext = os.path.splitext(file_path)[1].lower()
+    mime_map = {
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg', 
+        '.png': 'image/png',
+        '.webp': 'image/webp',
+        '.heic': 'image/heic'
+    }
+    return mime_map.get(ext, 'application/octet-stream')
+
+
+class ImageProbe(NamedTuple):
+    """File facts recorded at ingest, gathered by probe_image."""
+    size: int
+    width: int
+    height: int
+
+
+def probe_image(file_path: str) -> ImageProbe:
+    """
+    Get size and dimensions through a single open.
+    
+    Pillow parses the header from the same file object that was fstat'ed, so
+    pixel data is never read.
+    """
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        try:
+            with Image.open(f) as img:
+                width, height = img.size
+        except Exception:
+            width, height = 0, 0
+    
+    return ImageProbe(stat.st_size, width, height)
 
 
 def encode_image_to_base64(file_path: str) -> str:
     """Convert image file to base64 string."""
+    # Encode chunk by chunk so the raw file is never held alongside its encoding;
+    # chunks are a multiple of 3 bytes, so no padding lands mid-stream
+    encoded = bytearray()
     with open(file_path, 'rb') as f:
-        encoded = base64.b64encode(f.read()).decode('utf-8')
-        return encoded
+        while chunk := f.read(BASE64_CHUNK_SIZE):
+            encoded += base64.b64encode(chunk)
+    return encoded.decode('ascii')
 
 
-def is_supported_image(file_path: str, supported_formats: tuple) -> bool:
-    """Check if file is a supported image format."""
-    if not os.path.isfile(file_path):
+def _has_image_signature(file_path: str) -> bool:
+    """Check the file header against common image signatures (WebP via its RIFF header)."""
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return False
+    return header.startswith(IMAGE_SIGNATURES) or (header[:4] == b'RIFF' and header[8:12] == b'WEBP')
+
+
+def is_supported_image(file_path: str, supported_formats: tuple, *, is_file: Optional[bool] = None) -> bool:
+    """
+    Check if file is a supported image format.
+    
+    Callers that already know whether the path is a regular file (e.g. from an
+    os.scandir DirEntry) pass is_file to skip the stat.
+    """
+    # Check extension first; str.endswith takes the dotted extension tuple directly
+    if not file_path.lower().endswith(supported_formats):
         return False
     
-    # Check extension
-    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
-    if ext not in supported_formats:
+    if is_file is None:
+        is_file = os.path.isfile(file_path)
+    if not is_file:
         return False
     
+    # Common formats are recognised from their header; libmagic only runs on the rest
+    if _has_image_signature(file_path):
+        return True
+    
     # Verify MIME type
     mime_type = get_mime_type(file_path)
     return mime_type.startswith('image/')
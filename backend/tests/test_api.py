@@ -36,4 +36,19 @@ def test_submit_choice_invalid_selection(client: TestClient):
         "selection": "INVALID"
     })
     assert response.status_code == 400
-    assert "Selection must be" in response.json()["detail"]
\ No newline at end of file
+    assert "Selection must be" in response.json()["detail"]
+
+
+def test_state_query_count(client: TestClient, db, count_queries):
+    """Test state endpoint issues a fixed number of queries regardless of image count."""
+    from app.models import Image
+    db.add_all([
+        Image(sha256=f"{i:064x}", mu=1500.0 + i, sigma=100.0, exposures=i % 7)
+        for i in range(50)
+    ])
+    db.commit()
+    count_queries.clear()
+    
+    response = client.get("/api/state")
+    assert response.status_code == 200
+    assert len(count_queries) <= 4
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from app.utils.elo_utils import EloCalculator
+
+
+def test_update_ratings_batch_matches_scalar():
+    """Test the vectorized update agrees with update_ratings for LEFT, RIGHT and SKIP."""
+    calc = EloCalculator()
+    # Sigmas span the k_min/k_max clamps and the sigma_min floor
+    mu_a = [1500.0, 1720.5, 1310.0, 1500.0, 1650.0, 1400.0]
+    sigma_a = [350.0, 61.0, 900.0, 120.0, 60.0, 200.0]
+    mu_b = [1500.0, 1480.0, 1800.0, 1500.0, 1100.0, 1400.0]
+    sigma_b = [350.0, 40.0, 350.0, 800.0, 61.5, 200.0]
+    outcome = ["LEFT", "RIGHT", "SKIP", "LEFT", "RIGHT", "SKIP"]
+
+    batch = calc.update_ratings_batch(
+        np.array(mu_a), np.array(sigma_a), np.array(mu_b), np.array(sigma_b), np.array(outcome)
+    )
+
+    for i in range(len(outcome)):
+        scalar = calc.update_ratings(mu_a[i], sigma_a[i], mu_b[i], sigma_b[i], outcome[i])
+        assert [column[i] for column in batch] == pytest.approx(scalar, rel=1e-12)
+
+
+def test_update_ratings_batch_invalid_outcome():
+    """Test an unknown outcome is rejected like the scalar update."""
+    calc = EloCalculator()
+    with pytest.raises(ValueError):
+        calc.update_ratings_batch(
+            np.array([1500.0]), np.array([350.0]), np.array([1500.0]), np.array([350.0]), np.array(["BOTH"])
+        )
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import select
+
+
+def test_record_choices_batch(db):
+    """Test a LEFT/RIGHT/SKIP batch updates counters, stores choices and advances the round."""
+    from app.models import AppState, Choice, Image
+    from app.services.directory_choice_service import DirectoryChoiceService
+
+    a, b, c = "a" * 64, "b" * 64, "c" * 64
+    db.add(AppState(id=1, round=5))
+    db.add(Image(sha256=a))
+    db.commit()
+
+    next_round = DirectoryChoiceService(db).record_choices([
+        {"round": 5, "left_sha256": a, "right_sha256": b, "selection": "LEFT"},
+        {"round": 6, "left_sha256": b, "right_sha256": c, "selection": "RIGHT"},
+        {"round": 7, "left_sha256": a, "right_sha256": c, "selection": "SKIP"},
+    ])
+
+    assert next_round == 8
+    assert db.execute(select(AppState.round).where(AppState.id == 1)).scalar_one() == 8
+
+    db.expire_all()
+    images = {image.sha256: image for image in db.execute(select(Image)).scalars()}
+    assert set(images) == {a, b, c}
+    assert (images[a].exposures, images[a].likes, images[a].unlikes, images[a].skips) == (2, 1, 0, 1)
+    assert (images[b].exposures, images[b].likes, images[b].unlikes, images[b].skips) == (2, 0, 2, 0)
+    assert (images[c].exposures, images[c].likes, images[c].unlikes, images[c].skips) == (2, 1, 0, 1)
+    assert 5 + 11 <= images[a].next_eligible_round <= 5 + 49
+    assert images[b].next_eligible_round is None
+
+    choices = db.execute(select(Choice).order_by(Choice.round)).scalars().all()
+    assert [(choice.winner_sha256, choice.skipped) for choice in choices] == [(a, False), (c, False), (None, True)]
+
+
+def test_record_choices_invalid_selection(db):
+    """Test an unknown selection is rejected."""
+    from app.services.directory_choice_service import DirectoryChoiceService
+
+    with pytest.raises(ValueError):
+        DirectoryChoiceService(db).record_choices([
+            {"round": 1, "left_sha256": "a" * 64, "right_sha256": "b" * 64, "selection": "BOTH"},
+        ])
+
+
+def test_ingest_directory_counts(db, tmp_path, monkeypatch):
+    """Test ingest records one row per sha256 and counts same-content copies as duplicates."""
+    from PIL import Image as PILImage
+    from app.core.config import settings
+    from app.models import Image
+    from app.services.image_service import ImageService
+
+    monkeypatch.setattr(settings, "image_root", str(tmp_path))
+    PILImage.new("RGB", (4, 3), "red").save(tmp_path / "a.png")
+    PILImage.new("RGB", (4, 3), "blue").save(tmp_path / "b.png")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "a_copy.png").write_bytes((tmp_path / "a.png").read_bytes())
+
+    service = ImageService(db)
+    assert service.ingest_directory(str(tmp_path)) == (2, 1, 0)
+    assert service.ingest_directory(str(tmp_path)) == (0, 1, 2)
+
+    images = db.execute(select(Image)).scalars().all()
+    assert len(images) == 2
+    assert {(image.width, image.height) for image in images} == {(4, 3)}
+    assert service.get_duplicate_count() == 0
@@ -1,9 +1,10 @@
 # pip install "psycopg[binary]"  # psycopg v3
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Union, Iterable, Tuple
+from typing import Optional, Union, Iterable, List, Tuple
 import hashlib
 import os
+import re
 import psycopg
 from psycopg import Connection
 from psycopg.rows import tuple_row
@@ -14,7 +15,7 @@ class ImageStoreError(Exception):
 
 DDL_CREATE = """
 CREATE TABLE IF NOT EXISTS images (
-    sha256       TEXT PRIMARY KEY,
+    sha256       BYTEA PRIMARY KEY CONSTRAINT chk_sha256_len CHECK (octet_length(sha256) = 32),
     img_filename TEXT NOT NULL,
     img_bytes    BYTEA NOT NULL,
     created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
@@ -25,7 +26,15 @@ DDL_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_images_filename_created_at ON images (img_filename, created_at DESC);",
 ]
 
+SQL_UPSERT_IMAGE = """
+INSERT INTO images (sha256, img_filename, img_bytes)
+VALUES (%s, %s, %s)
+ON CONFLICT (sha256)
+DO UPDATE SET img_filename = EXCLUDED.img_filename
+"""
+
 SHA256_HEX_RE = "^[0-9a-f]{64}$"
+_SHA256_HEX = re.compile(SHA256_HEX_RE)
 
 @dataclass
 class ImageStore:
@@ -50,6 +59,9 @@ class ImageStore:
                     pass
                 self._owns_conn = False
             self._ensure_schema()
+            if self._owns_conn:
+                # Prepare every query on first use; set after the DDL, which can't be prepared
+                self._conn.prepare_threshold = 0
         except DatabaseError as e:
             raise ImageStoreError(f"DB init failed: {e}") from e
 
@@ -58,17 +70,25 @@ class ImageStore:
             cur.execute(DDL_CREATE)
             for stmt in DDL_INDEXES:
                 cur.execute(stmt)
-            # Add checksum format constraint if missing
+            # Tables from before sha256 moved to BYTEA: decode the hex keys in place,
+            # then add the digest length constraint if missing
             cur.execute("""
                 DO $$
                 BEGIN
+                  IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'images' AND column_name = 'sha256' AND data_type = 'text'
+                  ) THEN
+                    ALTER TABLE images DROP CONSTRAINT IF EXISTS chk_sha256_hex;
+                    ALTER TABLE images ALTER COLUMN sha256 TYPE BYTEA USING decode(sha256, 'hex');
+                  END IF;
                   IF NOT EXISTS (
                     SELECT 1 FROM pg_constraint c
                       JOIN pg_class t ON t.oid = c.conrelid
-                    WHERE t.relname = 'images' AND c.conname = 'chk_sha256_hex'
+                    WHERE t.relname = 'images' AND c.conname = 'chk_sha256_len'
                   ) THEN
                     ALTER TABLE images
-                    ADD CONSTRAINT chk_sha256_hex CHECK (sha256 ~ '^[0-9a-f]{64}$');
+                    ADD CONSTRAINT chk_sha256_len CHECK (octet_length(sha256) = 32);
                   END IF;
                 END$$;
             """)
@@ -85,8 +105,9 @@ class ImageStore:
             return f.read()
 
     @staticmethod
-    def _sha256(data: bytes) -> str:
-        return hashlib.sha256(data).hexdigest()
+    def _sha256(data: bytes) -> bytes:
+        # Raw 32-byte digest: the key column is BYTEA
+        return hashlib.sha256(data).digest()
 
     @staticmethod
     def _to_bytes(db_value) -> bytes:
@@ -99,10 +120,13 @@ class ImageStore:
             raise ImageStoreError("Unexpected BYTEA type from DB")
 
     @staticmethod
-    def _validate_sha(sha256: str):
-        import re
-        if not re.match(SHA256_HEX_RE, sha256 or ""):
-            raise ValueError("sha256 must be 64 lowercase hex characters")
+    def _sha_key(sha256: Union[str, bytes]) -> bytes:
+        """Validate a hex or raw digest and return the 32-byte key."""
+        if isinstance(sha256, (bytes, bytearray)) and len(sha256) == 32:
+            return bytes(sha256)
+        if not isinstance(sha256, str) or not _SHA256_HEX.fullmatch(sha256):
+            raise ValueError("sha256 must be 64 lowercase hex characters or 32 raw bytes")
+        return bytes.fromhex(sha256)
 
     # ---------- public API ----------
     def add_image(self, file_path: str) -> str:
@@ -115,30 +139,44 @@ class ImageStore:
             raw = self._read_file_bytes(file_path, self.max_bytes)
             sha = self._sha256(raw)
             filename = os.path.basename(file_path)
-            sql = """
-            INSERT INTO images (sha256, img_filename, img_bytes)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (sha256)
-            DO UPDATE SET img_filename = EXCLUDED.img_filename
-            """
             with self._conn.cursor() as cur:
-                cur.execute(sql, (sha, filename, psycopg.Binary(raw)))
-            return sha
+                cur.execute(SQL_UPSERT_IMAGE, (sha, filename, psycopg.Binary(raw)))
+            return sha.hex()
         except (DatabaseError, OSError) as e:
             raise ImageStoreError(f"add_image failed: {e}") from e
 
-    def get_image_bytes(self, sha256: str) -> Optional[bytes]:
-        """Return raw bytes by sha256, or None if not found."""
-        self._validate_sha(sha256)
+    def add_images(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        add_image for many files, sent through one pipeline so each upsert
+        doesn't wait for its own round-trip.
+        Returns the sha256 keys in input order.
+        """
+        shas = []
+        try:
+            with self._conn.pipeline(), self._conn.cursor() as cur:
+                for file_path in file_paths:
+                    raw = self._read_file_bytes(file_path, self.max_bytes)
+                    sha = self._sha256(raw)
+                    filename = os.path.basename(file_path)
+                    cur.execute(SQL_UPSERT_IMAGE, (sha, filename, psycopg.Binary(raw)))
+                    shas.append(sha.hex())
+            return shas
+        except (DatabaseError, OSError) as e:
+            raise ImageStoreError(f"add_images failed: {e}") from e
+
+    def get_image_bytes(self, sha256: Union[str, bytes]) -> Optional[bytes]:
+        """Return raw bytes by sha256 (hex or raw digest), or None if not found."""
+        key = self._sha_key(sha256)
         try:
             with self._conn.cursor(row_factory=tuple_row) as cur:
-                cur.execute("SELECT img_bytes FROM images WHERE sha256 = %s", (sha256,))
+                # Binary results return BYTEA as raw bytes instead of hex-escaped text
+                cur.execute("SELECT img_bytes FROM images WHERE sha256 = %s", (key,), binary=True)
                 row = cur.fetchone()
                 return self._to_bytes(row[0]) if row else None
         except DatabaseError as e:
             raise ImageStoreError(f"get_image_bytes failed: {e}") from e
 
-    def write_image_to(self, sha256: str, out_path: str) -> bool:
+    def write_image_to(self, sha256: Union[str, bytes], out_path: str) -> bool:
         """Retrieve by sha256 and write to out_path. Returns True if written, False if not found."""
         try:
             data = self.get_image_bytes(sha256)
@@ -164,6 +202,7 @@ class ImageStore:
                     LIMIT 1
                     """,
                     (img_filename,),
+                    binary=True,
                 )
                 row = cur.fetchone()
                 return self._to_bytes(row[0]) if row else None
@@ -177,7 +216,7 @@ class ImageStore:
             with self._conn.cursor(row_factory=tuple_row) as cur:
                 cur.execute(
                     """
-                    SELECT sha256, to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SSOF')
+                    SELECT encode(sha256, 'hex'), to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SSOF')
                     FROM images
                     WHERE img_filename = %s
                     ORDER BY created_at DESC